@@ -10,22 +10,49 @@ Providers supportés:
 - Ollama (local)
 """
 
+import asyncio
 import base64
+import functools
+import hashlib
+import io
 import json
 import mimetypes
+import mmap
+import os
+import re
+import reprlib
+import string
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, AsyncIterator
+from typing import Any, AsyncIterator, Final
 
-from .config import ThereseConfig, config
-from .memory import get_memory_manager
+from .config import ThereseConfig
+from .memory import MemoryManager, get_memory_manager
 from .providers import ProviderBase, StreamChunk, get_provider
-from .tools import TOOLS, get_tools_schema, get_tools_summary
+from .tools import (
+    TOOLS,
+    Tool,
+    ToolResult,
+    get_tools_schema,
+    get_tools_schema_subset,
+    get_tools_summary,
+)
 from .tools.project import detect_project
 from .checkpoints import CheckpointManager
 
+try:
+    import orjson
 
-@dataclass
+    _json_loads = orjson.loads
+except ImportError:  # orjson est optionnel (extra "fast")
+    _json_loads = json.loads
+
+
+@dataclass(slots=True)
 class Message:
     """Message dans la conversation."""
 
@@ -35,10 +62,31 @@ class Message:
     tool_call_id: str | None = None
     name: str | None = None
     images: list[str] | None = None  # Liste de chemins d'images
+    sent_at: int | None = None  # N° de la requête provider qui l'a transmis en premier
+    # Payload base64 des images, calculé une fois (cache interne, hors __init__/__eq__)
+    _encoded_images: list[dict] | None = field(default=None, init=False, repr=False, compare=False)
 
 
 # Extensions d'images supportées par Mistral Vision
-IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp"}
+IMAGE_EXTENSIONS: Final[frozenset[str]] = frozenset(
+    {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp"}
+)
+_IMAGE_SUFFIXES: Final[tuple[str, ...]] = tuple(IMAGE_EXTENSIONS)  # pour str.endswith
+
+
+@functools.lru_cache(maxsize=32)
+def _encode_image_cached(path: str, mtime_ns: int, size: int) -> str:
+    """
+    Lit et encode une image en base64.
+
+    mtime_ns et size font partie de la clé : une image modifiée sur le
+    disque est ré-encodée. mmap évite une copie complète du fichier en bytes.
+    """
+    with open(path, "rb") as f:
+        if size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return base64.b64encode(mapped).decode("ascii")
 
 
 def encode_image_to_base64(image_path: str) -> tuple[str, str]:
@@ -49,132 +97,221 @@ def encode_image_to_base64(image_path: str) -> tuple[str, str]:
         Tuple (base64_data, mime_type)
     """
     path = Path(image_path).expanduser().resolve()
-    if not path.exists():
-        raise FileNotFoundError(f"Image non trouvée: {image_path}")
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Image non trouvée: {image_path}") from None
 
     # Détecter le type MIME
     mime_type, _ = mimetypes.guess_type(str(path))
     if not mime_type:
         mime_type = "image/png"  # Fallback
 
-    # Lire et encoder en base64
-    with open(path, "rb") as f:
-        data = base64.standard_b64encode(f.read()).decode("utf-8")
-
+    data = _encode_image_cached(str(path), stat.st_mtime_ns, stat.st_size)
     return data, mime_type
 
 
+_PREVIEW_REPR = reprlib.Repr()
+_PREVIEW_REPR.maxlevel = 2
+_PREVIEW_REPR.maxstring = 40
+_PREVIEW_REPR.maxother = 40
+
+
+def _short_repr(value: Any, limit: int = 40) -> str:
+    """
+    repr() tronqué pour l'aperçu des arguments d'outils.
+
+    Les chaînes sont tronquées AVANT repr() : un `content` de 100 Ko
+    n'est pas recopié en entier juste pour en afficher 40 caractères.
+    """
+    if isinstance(value, (str, bytes)):
+        if len(value) <= limit:
+            return repr(value)
+        return repr(value[:limit])[:limit] + "..."
+    # Conteneurs : reprlib borne la taille du repr quel que soit le contenu
+    v_str = _PREVIEW_REPR.repr(value)
+    return v_str if len(v_str) <= limit else v_str[:limit] + "..."
+
+
+def _preview_result(result: str, max_lines: int = 30, max_chars: int = 2000) -> str:
+    """
+    Aperçu d'un résultat d'outil pour l'affichage.
+
+    Compte les lignes avec str.count() et ne coupe qu'au besoin : pas de
+    liste de milliers de lignes pour un gros résultat. max_chars borne
+    aussi la coupe par lignes (30 lignes minifiées peuvent peser des Mo).
+    """
+    line_count = result.count("\n") + 1
+    if line_count > max_lines:
+        end = -1
+        for _ in range(max_lines):
+            end = result.index("\n", end + 1)
+        if end <= max_chars:
+            return result[:end] + f"\n... ({line_count - max_lines} lignes de plus)"
+    if len(result) > max_chars:
+        return result[:max_chars] + "..."
+    return result
+
+
 def is_image_path(path: str) -> bool:
-    """Vérifie si un chemin pointe vers une image."""
-    try:
-        p = Path(path).expanduser()
-        return p.suffix.lower() in IMAGE_EXTENSIONS
-    except Exception:
+    """
+    Vérifie si un chemin pointe vers une image.
+
+    Un seul str.endswith sur la chaîne (pas de Path) : le cas courant,
+    un fichier qui n'est pas une image, sort immédiatement. Même règle que
+    Path.suffix : un fichier caché comme ".png" n'a pas d'extension.
+    """
+    lowered = path.lower()
+    if not lowered.endswith(_IMAGE_SUFFIXES):
         return False
+    dot = lowered.rfind(".")
+    return dot > 0 and lowered[dot - 1] not in ("/", os.sep)
+
 
+def classify_paths(paths: list[str]) -> tuple[list[str], list[str]]:
+    """
+    Sépare des chemins en images et autres fichiers, en une seule passe.
 
-@dataclass
+    Returns:
+        (image_paths, other_paths), dans l'ordre d'origine
+    """
+    image_paths: list[str] = []
+    other_paths: list[str] = []
+    is_image = is_image_path
+    for path in paths:
+        (image_paths if is_image(path) else other_paths).append(path)
+    return image_paths, other_paths
+
+
+# Prix Mistral (décembre 2025), en USD par 1K tokens : (input, output)
+_MODEL_PRICES: Final[dict[str, tuple[float, float]]] = {
+    # Devstral 2 (code agents) - déc 2025
+    "devstral-2": (0.0004, 0.002),  # $0.40/$2.00 per M tokens
+    "devstral-small-2": (0.0001, 0.0003),  # $0.10/$0.30 per M tokens
+    # Chat models
+    "mistral-large-latest": (0.002, 0.006),
+    "mistral-large-3-25-12": (0.002, 0.006),
+    "mistral-small-latest": (0.0002, 0.0006),
+    # Code models (legacy)
+    "codestral-latest": (0.001, 0.003),
+}
+_DEFAULT_PRICE: Final[tuple[float, float]] = (0.0004, 0.002)
+
+# Outils exposés aux modèles Ollama (21 tools = trop de contexte en local)
+_OLLAMA_ESSENTIAL_TOOLS: Final[frozenset[str]] = frozenset({
+    "read_file",    # Lire du code
+    "write_file",   # Écrire du code
+    "edit_file",    # Modifier du code
+    "bash",         # Exécuter des commandes
+    "tree",         # Explorer le projet
+    "grep",         # Rechercher dans le code
+    "glob",         # Trouver des fichiers
+    "git_status",   # Voir l'état Git
+})
+
+# Rôles qui ne peuvent pas suivre le résumé de compactage (qui est un message assistant)
+_NON_USER_TURN_ROLES: Final[frozenset[str]] = frozenset({"tool", "assistant"})
+
+# Plafond de génération du résumé de compactage (~300 mots demandés)
+_SUMMARY_MAX_TOKENS: Final[int] = 512
+
+# Résumé par fenêtres : l'historique ancien est découpé en sections de
+# ~2000 tokens, toutes résumées par un seul appel ([[1]] ... [[K]])
+_SUMMARY_WINDOW_CHARS: Final[int] = 8000
+_SUMMARY_MAX_WINDOWS: Final[int] = 4
+_SUMMARY_WINDOW_TOKENS: Final[int] = 200  # Budget de génération par section
+_SUMMARY_MARKER_RE: Final[re.Pattern[str]] = re.compile(r"\[\[(\d+)\]\]")
+
+# Fenêtres de contexte connues (tokens). Modèles absents : config.max_context_tokens
+_MODEL_CONTEXT_WINDOWS: Final[dict[str, int]] = {
+    "devstral-2": 256_000,
+    "devstral-small-2": 256_000,
+    "mistral-large-latest": 256_000,
+    "mistral-large-3-25-12": 256_000,
+    "mistral-medium-latest": 128_000,
+    "mistral-small-latest": 128_000,
+    "codestral-latest": 256_000,
+    "pixtral-large-latest": 128_000,
+    "pixtral-12b-2409": 128_000,
+    "magistral-medium-2509": 128_000,
+    "magistral-small-2509": 128_000,
+}
+
+
+@dataclass(slots=True)
 class TokenUsage:
     """Suivi de l'utilisation des tokens."""
 
     prompt_tokens: int = 0
     completion_tokens: int = 0
-    total_tokens: int = 0
+    # Taille du prompt de la dernière requête (= occupation réelle du contexte)
+    last_prompt_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """Total dérivé : un compteur de moins à tenir à jour à chaque requête."""
+        return self.prompt_tokens + self.completion_tokens
 
     def add(self, prompt: int, completion: int) -> None:
         self.prompt_tokens += prompt
         self.completion_tokens += completion
-        self.total_tokens += prompt + completion
+        self.last_prompt_tokens = prompt
 
     def estimate_cost(self, model: str = "devstral-2") -> float:
         """Estime le coût en USD."""
-        # Prix Mistral (décembre 2025)
-        prices = {
-            # Devstral 2 (code agents) - déc 2025
-            "devstral-2": (0.0004, 0.002),  # $0.40/$2.00 per M tokens
-            "devstral-small-2": (0.0001, 0.0003),  # $0.10/$0.30 per M tokens
-            # Chat models
-            "mistral-large-latest": (0.002, 0.006),  # input, output per 1K tokens
-            "mistral-large-3-25-12": (0.002, 0.006),
-            "mistral-small-latest": (0.0002, 0.0006),
-            # Code models (legacy)
-            "codestral-latest": (0.001, 0.003),
-        }
-        input_price, output_price = prices.get(model, (0.0004, 0.002))
-        return (self.prompt_tokens * input_price + self.completion_tokens * output_price) / 1000
+        input_price, output_price = _MODEL_PRICES.get(model, _DEFAULT_PRICE)
+        return (self.prompt_tokens * input_price + self.completion_tokens * output_price) * 1e-3
 
 
-@dataclass
-class ThereseAgent:
-    """Agent principal THERESE."""
-
-    config: ThereseConfig = field(default_factory=lambda: config)
-    messages: list[Message] = field(default_factory=list)
-    provider: ProviderBase | None = None
-    usage: TokenUsage = field(default_factory=TokenUsage)
-    checkpoint_manager: CheckpointManager | None = None
+class ToolRunCache:
+    """
+    Cache LRU des résultats d'outils en lecture seule.
 
-    def __post_init__(self) -> None:
-        """Initialise le provider et le checkpoint manager."""
-        self.config.validate()
-        self._init_provider()
-        self._init_checkpoint_manager()
-        self._add_system_prompt()
+    Clé : (nom de l'outil, arguments JSON canoniques). Vidé dès qu'un outil
+    qui modifie l'état (mutates_fs) est exécuté.
+    """
 
-    def _init_checkpoint_manager(self) -> None:
-        """Initialise le gestionnaire de checkpoints."""
-        try:
-            self.checkpoint_manager = CheckpointManager(self.config.working_dir)
-        except Exception:
-            self.checkpoint_manager = None
+    __slots__ = ("maxsize", "_entries")
 
-    def _init_provider(self) -> None:
-        """Initialise le provider LLM selon la config."""
-        if self.config.provider == "ollama":
-            self.provider = get_provider(
-                "ollama",
-                base_url=self.config.ollama_base_url,
-            )
-        else:
-            self.provider = get_provider(
-                "mistral",
-                api_key=self.config.api_key,
-            )
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
 
-    def _get_project_context(self) -> str:
-        """Récupère le contexte du projet."""
+    @staticmethod
+    def make_key(name: str, arguments: dict[str, Any]) -> tuple[str, str] | None:
+        """Construit la clé de cache, ou None si les arguments ne sont pas sérialisables."""
         try:
-            info = detect_project(self.config.working_dir)
-            memory = get_memory_manager(self.config.working_dir)
-
-            context = f"""
-## Projet actuel
-- **Nom:** {info.name}
-- **Type:** {info.type}
-- **Langage:** {info.language}
-- **Package Manager:** {info.package_manager or 'N/A'}
-"""
-            if info.frameworks:
-                context += f"- **Frameworks:** {', '.join(info.frameworks)}\n"
+            return name, json.dumps(arguments, sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, key: tuple[str, str]) -> str | None:
+        """Retourne le résultat en cache (et le marque comme récent)."""
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        return result
 
-            if info.scripts:
-                context += "\n**Scripts disponibles:** " + ", ".join(list(info.scripts.keys())[:5])
+    def put(self, key: tuple[str, str], result: str) -> None:
+        """Stocke un résultat, en évinçant le plus ancien si plein."""
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
 
-            # Ajouter la mémoire si elle existe
-            memory_context = memory.get_context()
-            if memory_context:
-                context += "\n" + memory_context
+    def clear(self) -> None:
+        """Vide le cache."""
+        self._entries.clear()
 
-            return context
-        except Exception:
-            return ""
+    def __len__(self) -> int:
+        return len(self._entries)
 
-    def _add_system_prompt(self) -> None:
-        """Ajoute le prompt système."""
-        tools_summary = get_tools_summary()
-        project_context = self._get_project_context()
 
-        system_prompt = f"""Tu es THÉRÈSE, un assistant de programmation expert propulsé par Mistral 3.
+# Prompt système statique (bannière, règles, style).
+# Seules les parties dépendant de la config/du projet sont injectées ($-substitution :
+# pas d'échappement d'accolades à gérer dans la bannière ASCII).
+_SYSTEM_PROMPT_TEMPLATE: Final[string.Template] = string.Template(
+    """Tu es THÉRÈSE, un assistant de programmation expert propulsé par Mistral 3.
 
 ████████╗██╗  ██╗███████╗██████╗ ███████╗███████╗███████╗
 ╚══██╔══╝██║  ██║██╔════╝██╔══██╗██╔════╝██╔════╝██╔════╝
@@ -196,12 +333,12 @@ Tu aides les développeurs à :
 - Suivre les tâches en cours
 
 ## Répertoire de travail
-`{self.config.working_dir}`
+`$working_dir`
 
-{project_context}
+$project_context
 
-## Tes outils ({len(TOOLS)} disponibles)
-{tools_summary}
+## Tes outils ($tools_count disponibles)
+$tools_summary
 
 ## Commandes slash
 L'utilisateur peut utiliser des commandes commençant par `/`:
@@ -214,7 +351,7 @@ L'utilisateur peut utiliser des commandes commençant par `/`:
 - `/model` : Changer de modèle
 - `/mode` : Mode d'approbation (auto/safe/yolo)
 
-## Mode d'approbation actuel: `{self.config.mode}`
+## Mode d'approbation actuel: `$mode`
 - `auto`: Confirmation pour les actions dangereuses
 - `safe`: Confirmation pour toutes les modifications
 - `yolo`: Aucune confirmation
@@ -235,8 +372,229 @@ L'utilisateur peut utiliser des commandes commençant par `/`:
 - Pas d'emojis sauf si demandé
 
 Allez, au boulot !"""
+)
+
+
+_PROJECT_BLOCK_TEMPLATE: Final[string.Template] = string.Template("""
+## Projet actuel
+- **Nom:** $name
+- **Type:** $type
+- **Langage:** $language
+- **Package Manager:** $package_manager
+""")
+
+
+# Fichiers lus par detect_project / la mémoire : leur mtime sert de clé de cache
+_PROJECT_MARKERS: Final[tuple[str, ...]] = (
+    "pyproject.toml",
+    "setup.py",
+    "requirements.txt",
+    "package.json",
+    "Cargo.toml",
+    "go.mod",
+    "Gemfile",
+    "composer.json",
+    "THERESE.md",
+)
+
+
+def _project_fingerprint(working_dir: str) -> tuple[int | None, ...]:
+    """mtime des fichiers marqueurs du projet (None si absent) : un stat par fichier."""
+    fingerprint = []
+    for name in _PROJECT_MARKERS:
+        try:
+            fingerprint.append(os.stat(os.path.join(working_dir, name)).st_mtime_ns)
+        except OSError:
+            fingerprint.append(None)
+    return tuple(fingerprint)
+
+
+@functools.lru_cache(maxsize=8)
+def _build_project_block(working_dir: str, fingerprint: tuple[int | None, ...] = ()) -> str:
+    """
+    Construit le bloc "Projet actuel" du prompt système.
+
+    Mis en cache par répertoire de travail et empreinte des fichiers marqueurs
+    (cf. _project_fingerprint) : detect_project et la lecture de THERESE.md
+    ne sont refaits que si l'un d'eux a changé, pas à chaque reset().
+    """
+    try:
+        path = Path(working_dir)
+        info = detect_project(path)
+        memory = get_memory_manager(path.resolve())
+
+        parts = [_PROJECT_BLOCK_TEMPLATE.substitute(
+            name=info.name,
+            type=info.type,
+            language=info.language,
+            package_manager=info.package_manager or "N/A",
+        )]
+        if info.frameworks:
+            parts.append(f"- **Frameworks:** {', '.join(info.frameworks)}\n")
+
+        if info.scripts:
+            parts.append("\n**Scripts disponibles:** " + ", ".join(list(info.scripts)[:5]))
+
+        # Ajouter la mémoire si elle existe
+        memory_context = memory.get_context()
+        if memory_context:
+            parts.append("\n" + memory_context)
+
+        return "".join(parts)
+    except Exception:
+        return ""
+
+
+@functools.lru_cache(maxsize=8)
+def _build_system_prompt(
+    working_dir: str,
+    mode: str,
+    tools_summary: str,
+    tools_count: int,
+    fingerprint: tuple[int | None, ...] = (),
+) -> str:
+    """
+    Assemble le prompt système complet.
+
+    La clé inclut le résumé des outils (lui-même mis en cache, donc hash
+    déjà calculé) : un nouvel outil enregistré produit un nouveau prompt.
+    """
+    return _SYSTEM_PROMPT_TEMPLATE.substitute(
+        working_dir=working_dir,
+        project_context=_build_project_block(working_dir, fingerprint),
+        tools_count=tools_count,
+        tools_summary=tools_summary,
+        mode=mode,
+    )
+
+
+def invalidate_project_cache() -> None:
+    """Invalide le contexte projet mis en cache (après /init ou modif de la mémoire)."""
+    _build_project_block.cache_clear()
+    _build_system_prompt.cache_clear()
+
+
+@dataclass(slots=True)
+class ThereseAgent:
+    """Agent principal THERESE."""
 
-        self.messages.append(Message(role="system", content=system_prompt))
+    config: ThereseConfig
+    messages: list[Message] = field(default_factory=list)
+    provider: ProviderBase | None = None
+    usage: TokenUsage = field(default_factory=TokenUsage)
+    checkpoint_manager: CheckpointManager | None = None
+    _provider_messages: list[dict] = field(default_factory=list, init=False, repr=False)
+    _tool_cache: ToolRunCache = field(default_factory=ToolRunCache, init=False, repr=False)
+    _request_count: int = field(default=0, init=False, repr=False)
+    _elidable_indices: list[int] = field(default_factory=list, init=False, repr=False)
+    _provider_key: tuple | None = field(default=None, init=False, repr=False)
+    _memory: MemoryManager | None = field(default=None, init=False, repr=False)
+    _memory_dir: Path | None = field(default=None, init=False, repr=False)
+    _loop: asyncio.AbstractEventLoop | None = field(default=None, init=False, repr=False)
+    _loop_thread: threading.Thread | None = field(default=None, init=False, repr=False)
+    # Compactage en cours en arrière-plan : (résumé à venir, 1er message conservé)
+    _pending_compact: tuple[Future, Message] | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Initialise le provider et le checkpoint manager."""
+        self.config.validate()
+        self._init_provider()
+        self._init_checkpoint_manager()
+        self._add_system_prompt()
+
+    def _init_checkpoint_manager(self) -> None:
+        """Initialise le gestionnaire de checkpoints."""
+        try:
+            self.checkpoint_manager = CheckpointManager(self.config.working_dir)
+        except Exception:
+            self.checkpoint_manager = None
+
+    def _init_provider(self) -> None:
+        """Initialise le provider LLM selon la config."""
+        self._provider_key = self._get_provider_key()
+        self.provider = self._create_provider()
+
+    def _create_provider(self) -> ProviderBase:
+        """Crée un provider LLM selon la config."""
+        if self.config.provider == "ollama":
+            return get_provider(
+                "ollama",
+                base_url=self.config.ollama_base_url,
+            )
+        return get_provider(
+            "mistral",
+            api_key=self.config.api_key,
+        )
+
+    def _get_provider_key(self) -> tuple:
+        """Paramètres qui imposent de recréer le provider s'ils changent."""
+        if self.config.provider == "ollama":
+            return ("ollama", self.config.ollama_base_url)
+        return ("mistral", self.config.api_key)
+
+    def _ensure_provider(self) -> None:
+        """Recrée le provider seulement si sa configuration a changé."""
+        if self.provider is None or self._provider_key != self._get_provider_key():
+            self._init_provider()
+
+    def _run_sync(self, coro: Any) -> Any:
+        """
+        Exécute une coroutine depuis du code synchrone.
+
+        Les outils tournent sur une event loop propre à l'agent, dans un thread
+        dédié démarré au premier appel : aucune loop créée par appel d'outil,
+        et chat_sync marche aussi depuis un thread dont la loop est déjà en
+        cours (générateur SSE du serveur HTTP), où run_until_complete échouerait.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            loop = self._loop = asyncio.new_event_loop()
+            self._loop_thread = threading.Thread(
+                target=loop.run_forever, name="therese-tools", daemon=True
+            )
+            self._loop_thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def close(self) -> None:
+        """Arrête l'event loop des outils (si elle a été démarrée)."""
+        self._pending_compact = None
+        loop, thread = self._loop, self._loop_thread
+        self._loop = self._loop_thread = None
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+            if thread.is_alive():
+                return  # Outil bloqué : le thread (daemon) mourra avec le process
+        loop.close()
+
+    def _get_memory(self) -> MemoryManager:
+        """
+        Gestionnaire de mémoire du projet, mis en cache sur l'agent.
+
+        Le chemin est résolu une fois par working_dir : l'agent partage ainsi
+        l'instance globale de /init et /memory (Path.cwd()) au lieu d'en
+        recréer une, avec sa propre copie de la mémoire, pour un chemin relatif.
+        """
+        working_dir = self.config.working_dir
+        if self._memory is None or self._memory_dir != working_dir:
+            self._memory = get_memory_manager(Path(working_dir).resolve())
+            self._memory_dir = working_dir
+        return self._memory
+
+    def _add_system_prompt(self) -> None:
+        """Ajoute le prompt système (mis en cache par répertoire, mode et outils)."""
+        working_dir = str(self.config.working_dir)
+        system_prompt = _build_system_prompt(
+            working_dir,
+            self.config.mode,
+            get_tools_summary(),
+            len(TOOLS),
+            _project_fingerprint(working_dir),
+        )
+
+        self._append_message(Message(role="system", content=system_prompt))
 
     async def _execute_tool(self, name: str, arguments: dict[str, Any]) -> str:
         """Exécute un outil et retourne le résultat (async)."""
@@ -244,14 +602,20 @@ Allez, au boulot !"""
         if not tool:
             return f"Erreur: outil '{name}' non trouvé"
 
+        cache_key = self._tool_cache.make_key(name, arguments) if tool.cacheable else None
+        if cache_key is not None:
+            cached = self._tool_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
             result = await tool.execute(**arguments)
+            self._update_tool_cache(tool, cache_key, result)
 
             # Tracker les changements dans la mémoire
             if name in ("write_file", "edit_file") and result.success:
-                memory = get_memory_manager(self.config.working_dir)
                 file_path = arguments.get("file_path", "unknown")
-                memory.add_change(f"Modifié: {file_path}")
+                self._get_memory().add_change(f"Modifié: {file_path}")
 
             return result.to_string()
         except Exception as e:
@@ -259,12 +623,16 @@ Allez, au boulot !"""
 
     def _execute_tool_sync(self, name: str, arguments: dict[str, Any]) -> str:
         """Exécute un outil de manière synchrone (pour chat_sync)."""
-        import asyncio
-
         tool = TOOLS.get(name)
         if not tool:
             return f"Erreur: outil '{name}' non trouvé"
 
+        cache_key = self._tool_cache.make_key(name, arguments) if tool.cacheable else None
+        if cache_key is not None:
+            cached = self._tool_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
             # Auto-checkpoint AVANT les modifications de fichiers
             if name in ("write_file", "edit_file") and self.checkpoint_manager:
@@ -275,81 +643,193 @@ Allez, au boulot !"""
                 except Exception:
                     pass  # Ne pas bloquer si checkpoint échoue
 
-            # Nettoyer toute loop existante avant d'en créer une nouvelle
-            try:
-                asyncio.set_event_loop(None)
-            except Exception:
-                pass
+            result = self._run_sync(tool.execute(**arguments))
 
-            # Créer une nouvelle event loop isolée
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                result = loop.run_until_complete(tool.execute(**arguments))
-            finally:
-                loop.close()
-                asyncio.set_event_loop(None)
+            self._update_tool_cache(tool, cache_key, result)
 
             # Tracker les changements dans la mémoire
             if name in ("write_file", "edit_file") and result.success:
-                memory = get_memory_manager(self.config.working_dir)
                 file_path = arguments.get("file_path", "unknown")
-                memory.add_change(f"Modifié: {file_path}")
+                self._get_memory().add_change(f"Modifié: {file_path}")
 
             return result.to_string()
         except Exception as e:
             return f"Erreur d'exécution de {name}: {e}"
 
+    def _update_tool_cache(
+        self, tool: Tool, cache_key: tuple[str, str] | None, result: ToolResult
+    ) -> None:
+        """Met à jour le cache d'outils après une exécution."""
+        if tool.mutates_fs:
+            # Un outil qui modifie l'état peut rendre toute lecture obsolète
+            self._tool_cache.clear()
+        elif cache_key is not None and result.success:
+            self._tool_cache.put(cache_key, result.to_string())
+
+    @staticmethod
+    def _is_parallel_safe(name: str) -> bool:
+        """Un outil peut tourner en parallèle s'il existe et ne modifie rien."""
+        tool = TOOLS.get(name)
+        return tool is not None and not tool.mutates_fs
+
+    def _execute_tools_parallel_sync(self, calls: list[tuple[str, dict[str, Any]]]) -> list[str]:
+        """
+        Exécute plusieurs outils en lecture seule en parallèle (pour chat_sync).
+
+        Les résultats sont retournés dans l'ordre des appels. La concurrence
+        est bornée par config.max_parallel_tools. Les appels identiques d'un
+        même lot (le modèle relit parfois deux fois le même fichier) ne sont
+        exécutés qu'une fois : lancés ensemble, ils rateraient tous le cache.
+        """
+        # Index du premier appel identique pour chaque appel du lot
+        first_index: dict[tuple[str, str], int] = {}
+        sources: list[int] = []
+        for i, (name, arguments) in enumerate(calls):
+            key = ToolRunCache.make_key(name, arguments)
+            sources.append(i if key is None else first_index.setdefault(key, i))
+        unique = sorted(set(sources))
+
+        async def run_all() -> list[str]:
+            semaphore = asyncio.Semaphore(max(1, self.config.max_parallel_tools))
+
+            async def run_one(name: str, arguments: dict[str, Any]) -> str:
+                async with semaphore:
+                    return await self._execute_tool(name, arguments)
+
+            return await asyncio.gather(*(run_one(*calls[i]) for i in unique))
+
+        results = dict(zip(unique, self._run_sync(run_all())))
+        return [results[source] for source in sources]
+
     def _get_ollama_tools(self) -> list[dict]:
         """Retourne un subset de tools essentiels pour Ollama.
 
         21 tools = trop de contexte pour les modèles locaux.
         On garde les 8 outils les plus importants pour le coding.
         """
-        essential_tools = [
-            "read_file",    # Lire du code
-            "write_file",   # Écrire du code
-            "edit_file",    # Modifier du code
-            "bash",         # Exécuter des commandes
-            "tree",         # Explorer le projet
-            "grep",         # Rechercher dans le code
-            "glob",         # Trouver des fichiers
-            "git_status",   # Voir l'état Git
-        ]
-
-        all_tools = get_tools_schema()
-        return [t for t in all_tools if t["function"]["name"] in essential_tools]
-
-    def _messages_to_provider_format(self, images: list[str] | None = None) -> list[dict]:
-        """Convertit les messages au format générique pour les providers."""
-        result = []
-        for msg in self.messages:
-            msg_dict = {
-                "role": msg.role,
-                "content": msg.content,
-            }
-            if msg.images:
-                # Encoder les images en base64 pour le provider
+        # Filtré une fois par registre d'outils (cf. get_tools_schema_subset)
+        return get_tools_schema_subset(_OLLAMA_ESSENTIAL_TOOLS)
+
+    def _message_to_provider_format(self, msg: Message) -> dict:
+        """Convertit un message au format générique pour les providers."""
+        msg_dict = {
+            "role": msg.role,
+            "content": msg.content,
+        }
+        if msg.images:
+            # Encoder les images en base64 une seule fois par message :
+            # les reconstructions du buffer (compactage, trim) réutilisent le résultat
+            if msg._encoded_images is None:
                 encoded_images = []
                 for img_path in msg.images:
                     try:
                         b64_data, mime_type = encode_image_to_base64(img_path)
+                        # Pas de data URL pré-construite : elle dupliquerait tout
+                        # le base64 en mémoire. Le provider qui en a besoin la construit.
                         encoded_images.append({
-                            "url": f"data:{mime_type};base64,{b64_data}",
                             "base64": b64_data,
+                            "mime_type": mime_type,
                         })
                     except Exception:
                         pass
-                if encoded_images:
-                    msg_dict["images"] = encoded_images
-            if msg.tool_calls:
-                msg_dict["tool_calls"] = msg.tool_calls
-            if msg.tool_call_id:
-                msg_dict["tool_call_id"] = msg.tool_call_id
-            if msg.name:
-                msg_dict["name"] = msg.name
-            result.append(msg_dict)
-        return result
+                msg._encoded_images = encoded_images
+            if msg._encoded_images:
+                msg_dict["images"] = msg._encoded_images
+        if msg.tool_calls:
+            msg_dict["tool_calls"] = msg.tool_calls
+        if msg.tool_call_id:
+            msg_dict["tool_call_id"] = msg.tool_call_id
+        if msg.name:
+            msg_dict["name"] = msg.name
+        return msg_dict
+
+    def _append_message(self, msg: Message) -> None:
+        """Ajoute un message à l'historique et à son équivalent provider."""
+        self.messages.append(msg)
+        self._provider_messages.append(self._message_to_provider_format(msg))
+        if self._is_elidable(msg):
+            self._elidable_indices.append(len(self.messages) - 1)
+
+    def _splice_messages(self, start: int, stop: int, replacement: list[Message]) -> None:
+        """
+        Remplace self.messages[start:stop] en gardant le buffer provider aligné.
+
+        Les messages conservés gardent leur dict provider (et donc la
+        conversion mise en cache côté provider) : seuls les nouveaux sont convertis.
+        """
+        if len(self._provider_messages) != len(self.messages):
+            self._rebuild_provider_messages()
+        self.messages[start:stop] = replacement
+        self._provider_messages[start:stop] = [
+            self._message_to_provider_format(m) for m in replacement
+        ]
+        shift = len(replacement) - (stop - start)
+        self._elidable_indices = (
+            [i for i in self._elidable_indices if i < start]
+            + [start + j for j, m in enumerate(replacement) if self._is_elidable(m)]
+            + [i + shift for i in self._elidable_indices if i >= stop]
+        )
+
+    def _rebuild_provider_messages(self) -> None:
+        """Reconstruit le buffer provider depuis self.messages (après compactage)."""
+        self._provider_messages = [self._message_to_provider_format(m) for m in self.messages]
+        self._elidable_indices = [i for i, m in enumerate(self.messages) if self._is_elidable(m)]
+
+    def _is_elidable(self, msg: Message) -> bool:
+        """Un résultat d'outil volumineux peut être remplacé par son empreinte."""
+        return (
+            self.config.elide_tool_results_after > 0
+            and msg.role == "tool"
+            and len(msg.content) > self.config.elide_tool_results_min_chars
+        )
+
+    def _elide_old_tool_results(self) -> None:
+        """
+        Remplace les gros résultats d'outils déjà vus par le modèle.
+
+        Une fois transmis, un résultat de 200 Ko n'a pas besoin d'être renvoyé
+        intégralement à chaque itération suivante. Seul le payload provider est
+        modifié : self.messages garde le contenu complet.
+        """
+        still_pending = []
+        for i in self._elidable_indices:
+            msg = self.messages[i]
+            if msg.sent_at is None:
+                msg.sent_at = self._request_count
+            if self._request_count - msg.sent_at > self.config.elide_tool_results_after:
+                digest = hashlib.sha1(msg.content.encode("utf-8", errors="replace")).hexdigest()
+                self._provider_messages[i] = {
+                    **self._provider_messages[i],
+                    "content": (
+                        f"[Résultat déjà transmis : {msg.name} — {len(msg.content)} caractères, "
+                        f"sha={digest[:12]}. Relance l'outil si tu as besoin du contenu.]"
+                    ),
+                }
+            else:
+                still_pending.append(i)
+        self._elidable_indices = still_pending
+
+    def _messages_to_provider_format(self) -> list[dict]:
+        """
+        Retourne les messages au format générique pour les providers.
+
+        Le buffer est alimenté au fil de l'eau par _append_message : chaque
+        itération de chat_sync ne convertit plus tout l'historique.
+        """
+        if len(self._provider_messages) != len(self.messages):
+            # Filet de sécurité si self.messages a été modifié directement
+            self._rebuild_provider_messages()
+        self._request_count += 1
+        self._elide_old_tool_results()
+        return self._provider_messages
+
+    def prepend_system_prompt(self, prefix: str) -> None:
+        """Injecte un prompt (agent personnalisé) avant le prompt système."""
+        if not self.messages:
+            return
+        original_system = self.messages[0].content
+        self.messages[0].content = f"{prefix}\n\n---\n\n{original_system}"
+        self._rebuild_provider_messages()
 
     def chat_sync(
         self, user_input: str, images: list[str] | None = None
@@ -362,26 +842,26 @@ Allez, au boulot !"""
 
         Yields des chunks de texte pour l'affichage streaming.
         """
-        import asyncio
+        # Réutiliser le provider (et son client HTTP partagé) d'un tour à l'autre
+        self._ensure_provider()
 
-        # IMPORTANT: Nettoyer toute référence à une event loop existante
-        try:
-            asyncio.set_event_loop(None)
-        except Exception:
-            pass
+        # Résumé calculé en arrière-plan depuis le tour précédent
+        compact_msg = self._apply_pending_compact()
+        if compact_msg:
+            yield f"{compact_msg}\n\n"
 
-        # Recréer le provider (thread safety)
-        self._init_provider()
+        # Les fichiers ont pu changer hors de THERESE entre deux tours
+        self._tool_cache.clear()
 
         # FIX: Vérifier si le dernier message est un "tool"
         if self.messages and self.messages[-1].role == "tool":
-            self.messages.append(Message(
+            self._append_message(Message(
                 role="assistant",
                 content="(Reprise de la conversation après interruption)"
             ))
 
         # Ajouter le message utilisateur (avec images si présentes)
-        self.messages.append(Message(role="user", content=user_input, images=images))
+        self._append_message(Message(role="user", content=user_input, images=images))
 
         # Déterminer le modèle selon le provider
         if self.config.provider == "ollama":
@@ -392,23 +872,36 @@ Allez, au boulot !"""
 
         max_iterations = 15
 
+        # Schémas des tools : sélectionnés une fois pour tout le tour
+        turn_tools = None
+        if self.provider and self.provider.supports_tools:
+            # Ollama : subset de tools essentiels (21 tools = trop pour le contexte)
+            if self.config.provider == "ollama":
+                turn_tools = self._get_ollama_tools()
+            else:
+                turn_tools = get_tools_schema()
+
         for iteration in range(max_iterations):
             # Préparer les messages pour le provider
-            provider_messages = self._messages_to_provider_format(images)
-
-            # Préparer les tools (sauf première itération avec images sur Mistral)
-            tools = None
-            if not (images and iteration == 0 and self.config.provider == "mistral"):
-                if self.provider and self.provider.supports_tools:
-                    # Ollama : subset de tools essentiels (21 tools = trop pour le contexte)
-                    if self.config.provider == "ollama":
-                        tools = self._get_ollama_tools()
-                    else:
-                        tools = get_tools_schema()
+            provider_messages = self._messages_to_provider_format()
+
+            # Pas de tools à la première itération avec images sur Mistral
+            tools = turn_tools
+            if images and iteration == 0 and self.config.provider == "mistral":
+                tools = None
 
             # Appel streaming via le provider
-            content_chunks: list[str] = []
+            content_buf = io.StringIO()
             tool_calls: list[dict] = []
+            last_usage: dict | None = None
+
+            # Regroupement des deltas : moins d'allers-retours vers l'UI / le SSE
+            pending: list[str] = []
+            # Des blancs seuls ("\n", " ") ne justifient pas un rafraîchissement
+            pending_visible = False
+            flush_chunks = max(1, self.config.stream_flush_chunks)
+            flush_delay = self.config.stream_flush_ms / 1000
+            last_flush = time.monotonic()
 
             try:
                 for chunk in self.provider.chat_stream(
@@ -418,75 +911,106 @@ Allez, au boulot !"""
                 ):
                     # Contenu textuel
                     if chunk.content:
-                        content_chunks.append(chunk.content)
-                        yield chunk.content
+                        content_buf.write(chunk.content)
+                        pending.append(chunk.content)
+                        if not pending_visible and not chunk.content.isspace():
+                            pending_visible = True
 
                     # Tool calls
                     if chunk.tool_calls:
                         tool_calls = chunk.tool_calls
 
-                    # Usage
+                    # Usage (rapporté en fin de stream : on ne garde que le dernier)
                     if chunk.usage:
-                        self.usage.add(
-                            chunk.usage.get("prompt_tokens", 0),
-                            chunk.usage.get("completion_tokens", 0),
-                        )
+                        last_usage = chunk.usage
+
+                    # Évalué à chaque chunk, même sans contenu : pendant le stream
+                    # des arguments d'un tool call, le texte en attente ne doit
+                    # pas rester bloqué (et part avant l'exécution des outils)
+                    if pending_visible:
+                        now = time.monotonic()
+                        if (
+                            tool_calls
+                            or len(pending) >= flush_chunks
+                            or now - last_flush >= flush_delay
+                        ):
+                            yield "".join(pending)
+                            pending.clear()
+                            pending_visible = False
+                            last_flush = now
 
             except Exception as e:
+                if pending:
+                    yield "".join(pending)
                 yield f"\n\n❌ Erreur provider: {e}"
                 return
 
-            full_content = "".join(content_chunks)
+            # Des blancs avant des tool calls : l'en-tête d'outil saute déjà des lignes
+            if pending and (pending_visible or not tool_calls):
+                yield "".join(pending)
+
+            if last_usage:
+                self.usage.add(
+                    last_usage.get("prompt_tokens", 0),
+                    last_usage.get("completion_tokens", 0),
+                )
+
+            full_content = content_buf.getvalue()
 
             # Si pas de tool calls, on a fini
             if not tool_calls:
-                self.messages.append(Message(
+                self._append_message(Message(
                     role="assistant",
                     content=full_content,
                 ))
                 break
 
             # Ajouter le message assistant avec tool calls
-            self.messages.append(Message(
+            self._append_message(Message(
                 role="assistant",
                 content=full_content,
                 tool_calls=tool_calls,
             ))
 
-            # Exécuter les outils (de manière synchrone)
+            # Parser les arguments de tous les appels
+            calls: list[tuple[dict, str, dict[str, Any]]] = []
             for tc in tool_calls:
                 func_name = tc["function"]["name"]
                 try:
-                    func_args = json.loads(tc["function"]["arguments"])
+                    func_args = _json_loads(tc["function"]["arguments"])
                 except json.JSONDecodeError:
                     func_args = {}
+                calls.append((tc, func_name, func_args))
+
+            # Résultats des groupes d'outils en lecture seule exécutés en parallèle
+            batched_results: dict[int, str] = {}
+
+            for i, (tc, func_name, func_args) in enumerate(calls):
+                # En-tête en un seul yield, émis avant l'exécution pour que
+                # l'utilisateur voie l'outil en cours pendant un bash un peu long
+                args_preview = ", ".join(f"{k}={_short_repr(v)}" for k, v in func_args.items())
+                yield f"\n\n⚙️  **{func_name}**({args_preview})\n"
+
+                # Début d'une série d'appels consécutifs sans effet de bord :
+                # exécution concurrente (latence = max au lieu de somme).
+                # Les outils qui modifient l'état restent séquentiels et ordonnés.
+                if i not in batched_results:
+                    run_end = i
+                    while run_end < len(calls) and self._is_parallel_safe(calls[run_end][1]):
+                        run_end += 1
+                    if run_end - i > 1:
+                        results = self._execute_tools_parallel_sync(
+                            [(name, args) for _, name, args in calls[i:run_end]]
+                        )
+                        batched_results.update(zip(range(i, run_end), results))
+
+                result = batched_results.pop(i, None)
+                if result is None:
+                    result = self._execute_tool_sync(func_name, func_args)
 
-                yield f"\n\n⚙️  **{func_name}**"
-                if func_args:
-                    args_preview = []
-                    for k, v in func_args.items():
-                        v_str = repr(v)
-                        if len(v_str) > 40:
-                            v_str = v_str[:40] + "..."
-                        args_preview.append(f"{k}={v_str}")
-                    yield f"({', '.join(args_preview)})\n"
-                else:
-                    yield "()\n"
-
-                # Exécuter l'outil de manière synchrone
-                result = self._execute_tool_sync(func_name, func_args)
-
-                lines = result.split("\n")
-                if len(lines) > 30:
-                    result_preview = "\n".join(lines[:30]) + f"\n... ({len(lines) - 30} lignes de plus)"
-                elif len(result) > 2000:
-                    result_preview = result[:2000] + "..."
-                else:
-                    result_preview = result
-
-                yield f"\n{result_preview}\n"
-
-                self.messages.append(Message(
+                yield f"\n{_preview_result(result)}\n"
+
+                self._append_message(Message(
                     role="tool",
                     content=result,
                     tool_call_id=tc["id"],
@@ -496,49 +1020,170 @@ Allez, au boulot !"""
         else:
             yield "\n\n⚠️ Limite d'itérations atteinte. La tâche est peut-être trop complexe."
 
-        # Auto-compact si nécessaire (après la réponse)
-        compacted, compact_msg = self.auto_compact()
-        if compacted:
-            yield f"\n\n{compact_msg}"
+        # Auto-compact si nécessaire : le résumé est généré en arrière-plan
+        # et appliqué au début du tour suivant, sans bloquer l'utilisateur
+        self._schedule_auto_compact()
+
+        self._trim_history()
 
-    def reset(self) -> None:
-        """Réinitialise la conversation."""
+    def reset(self, keep_usage: bool = True) -> None:
+        """
+        Réinitialise la conversation.
+
+        Args:
+            keep_usage: Conserver le suivi des tokens (coût de la session)
+        """
+        self._pending_compact = None
         self.messages.clear()
+        self._provider_messages.clear()
+        self._elidable_indices.clear()
+        if not keep_usage:
+            self.usage = TokenUsage()
+        self._tool_cache.clear()
         self._add_system_prompt()
 
+    def _trim_history(self) -> None:
+        """
+        Applique le plafond config.max_messages à l'historique.
+
+        Filet de sécurité si l'auto-compact est désactivé : on garde le prompt
+        système et on supprime les plus anciens messages en une seule coupe,
+        alignée sur un message "user" pour ne pas orpheliner de résultats d'outils.
+        """
+        max_messages = self.config.max_messages
+        if max_messages <= 0 or len(self.messages) <= max_messages:
+            return
+
+        cut = len(self.messages) - (max_messages - 1)
+        while cut < len(self.messages) and self.messages[cut].role != "user":
+            cut += 1
+        if cut >= len(self.messages):
+            return
+
+        self._splice_messages(1, cut, [])
+
     def _should_auto_compact(self) -> bool:
-        """Vérifie si on doit auto-compacter basé sur les tokens."""
+        """
+        Vérifie si on doit auto-compacter basé sur les tokens.
+
+        Se base sur le prompt de la dernière requête (taille effective du
+        contexte renvoyé à chaque itération), pas sur le cumul de la session.
+        """
         if not self.config.auto_compact:
             return False
-        threshold = int(self.config.max_context_tokens * self.config.compact_threshold)
-        return self.usage.prompt_tokens > threshold
+        threshold = int(self._context_budget() * self.config.compact_threshold)
+        return self.usage.last_prompt_tokens > threshold
+
+    def _context_budget(self) -> int:
+        """Budget de contexte : la fenêtre du modèle actif, plafonnée par la config."""
+        window = _MODEL_CONTEXT_WINDOWS.get(self.config.get_active_model())
+        if window is None:
+            return self.config.max_context_tokens
+        return min(window, self.config.max_context_tokens)
+
+    @staticmethod
+    def _fallback_summary(messages: list[Message]) -> str:
+        """Résumé local (sans LLM) : volume et fichiers touchés."""
+        files: list[str] = []
+        for msg in messages:
+            for tc in msg.tool_calls or ():
+                if tc["function"]["name"] not in ("write_file", "edit_file"):
+                    continue
+                try:
+                    file_path = _json_loads(tc["function"]["arguments"]).get("file_path")
+                except (ValueError, AttributeError):
+                    continue
+                if file_path and file_path not in files:
+                    files.append(file_path)
+        touched = ", ".join(files[-10:]) if files else "aucun"
+        return f"[Résumé auto: {len(messages)} messages précédents, fichiers modifiés: {touched}]"
+
+    @staticmethod
+    def _summary_line(msg: Message) -> str:
+        """Formate un message pour le prompt de résumé."""
+        prefix = "👤" if msg.role == "user" else "🤖" if msg.role == "assistant" else "🔧"
+        if msg.role == "tool":
+            # Résultats d'outils : nom + début suffisent pour le résumé
+            content = f"{msg.name}: {msg.content[:200]}" if msg.content else f"{msg.name}"
+        else:
+            content = msg.content[:500] if msg.content else ""
+        if msg.tool_calls:
+            tools = [tc["function"]["name"] for tc in msg.tool_calls]
+            content += f" [Tools: {', '.join(tools)}]"
+        return f"{prefix} {content}"
+
+    def _summary_windows(
+        self,
+        messages: list[Message],
+        window_chars: int = _SUMMARY_WINDOW_CHARS,
+        max_windows: int = _SUMMARY_MAX_WINDOWS,
+    ) -> list[str]:
+        """
+        Découpe les messages formatés en fenêtres d'au plus window_chars.
 
-    def _format_messages_for_summary(self, messages: list[Message]) -> str:
-        """Formate les messages pour le résumé."""
-        formatted = []
+        S'arrête dès que max_windows fenêtres sont pleines : inutile de
+        formater tout un long historique pour n'en garder que le début.
+        """
+        windows: list[str] = []
+        current: list[str] = []
+        size = 0
         for msg in messages:
             if msg.role == "system":
                 continue
-            prefix = "👤" if msg.role == "user" else "🤖" if msg.role == "assistant" else "🔧"
-            content = msg.content[:500] if msg.content else ""
-            if msg.tool_calls:
-                tools = [tc["function"]["name"] for tc in msg.tool_calls]
-                content += f" [Tools: {', '.join(tools)}]"
-            formatted.append(f"{prefix} {content}")
-        return "\n\n".join(formatted)
-
-    def _generate_summary_sync(self, messages: list[Message]) -> str:
-        """Génère un résumé LLM des messages (sync)."""
-        formatted = self._format_messages_for_summary(messages)
-        summary_prompt = f"""Résume cette conversation en 3-5 points clés.
+            line = self._summary_line(msg)[:window_chars]
+            if current and size + len(line) > window_chars:
+                windows.append("\n\n".join(current))
+                if len(windows) == max_windows:
+                    return windows
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 2
+        if current:
+            windows.append("\n\n".join(current))
+        return windows
+
+    @staticmethod
+    def _summary_prompt(windows: list[str]) -> str:
+        """Prompt de résumé : une seule section, ou K sections numérotées."""
+        if len(windows) == 1:
+            return f"""Résume cette conversation en 3-5 points clés.
 Garde les informations importantes : fichiers modifiés, décisions prises, problèmes résolus.
 Sois concis (max 300 mots).
 
 Conversation:
-{formatted[:8000]}
+{windows[0]}
 
 Résumé:"""
 
+        sections = "\n\n".join(f"[[{i}]]\n{window}" for i, window in enumerate(windows, 1))
+        return f"""Voici une conversation découpée en {len(windows)} sections numérotées.
+Résume chaque section en 2-3 points clés (fichiers modifiés, décisions prises, problèmes résolus).
+Commence chaque résumé par le marqueur de sa section ([[1]], [[2]]...), dans l'ordre.
+Sois concis (max 80 mots par section).
+
+{sections}
+
+Résumés:"""
+
+    @staticmethod
+    def _parse_window_summaries(text: str) -> str:
+        """Recolle les résumés délimités par [[k]] (texte brut si aucun marqueur)."""
+        parts = _SUMMARY_MARKER_RE.split(text)
+        # split avec groupe : [avant, k1, texte1, k2, texte2, ...]
+        summaries = [part.strip() for part in parts[2::2] if part.strip()]
+        return "\n\n".join(summaries) if summaries else text.strip()
+
+    def _generate_summary_sync(
+        self, messages: list[Message], provider: ProviderBase | None = None
+    ) -> str:
+        """Génère un résumé LLM des messages, en un seul appel (sync)."""
+        provider = provider or self.provider
+        windows = self._summary_windows(messages)
+        if not windows:
+            return self._fallback_summary(messages)
+        summary_prompt = self._summary_prompt(windows)
+        max_tokens = max(_SUMMARY_MAX_TOKENS, _SUMMARY_WINDOW_TOKENS * len(windows))
+
         try:
             # Utiliser un modèle rapide selon le provider
             if self.config.provider == "ollama":
@@ -547,72 +1192,157 @@ Résumé:"""
                 model = "mistral-small-latest"
 
             # Récupérer le résumé via le provider
-            summary_parts = []
-            for chunk in self.provider.chat_stream(
+            summary_buf = io.StringIO()
+            for chunk in provider.chat_stream(
                 messages=[{"role": "user", "content": summary_prompt}],
                 model=model,
+                max_tokens=max_tokens,
             ):
                 if chunk.content:
-                    summary_parts.append(chunk.content)
+                    summary_buf.write(chunk.content)
 
-            return "".join(summary_parts) or "[Résumé indisponible]"
-        except Exception as e:
-            return f"[Résumé auto: {len(messages)} messages précédents - Erreur: {e}]"
+            summary = summary_buf.getvalue()
+            if len(windows) > 1:
+                summary = self._parse_window_summaries(summary)
+            return summary or self._fallback_summary(messages)
+        except Exception:
+            return self._fallback_summary(messages)
 
-    def auto_compact(self) -> tuple[bool, str]:
+    def _plan_compaction(self) -> tuple[list[Message], Message] | None:
         """
-        Auto-compacte si nécessaire. Utilise le LLM pour résumer.
+        Choisit les messages à résumer.
 
         Returns:
-            (compacted: bool, message: str)
+            (messages anciens, premier message conservé) ou None si rien à faire
         """
-        if not self._should_auto_compact():
-            return False, ""
-
-        if len(self.messages) <= self.config.compact_keep_recent + 2:
-            return False, ""
+        messages = self.messages
+        if len(messages) <= self.config.compact_keep_recent + 2:
+            return None
 
         # Séparer les messages
-        system_msg = self.messages[0]
-        recent = self.messages[-self.config.compact_keep_recent:]
-        old_messages = self.messages[1:-self.config.compact_keep_recent]
+        recent_start = len(messages) - self.config.compact_keep_recent
+        old_messages = messages[1:recent_start]
 
         if not old_messages:
-            return False, ""
+            return None
 
-        # S'assurer que recent commence par un message "user" pour un ordre valide
+        # S'assurer que les messages gardés commencent par un "user" pour un ordre valide
         # Sinon on risque: assistant (résumé) -> tool -> user (invalide)
-        while recent and recent[0].role in ("tool", "assistant"):
-            recent = recent[1:]
+        first_kept = recent_start
+        while first_kept < len(messages) and messages[first_kept].role in _NON_USER_TURN_ROLES:
+            first_kept += 1
 
-        if not recent:
-            return False, ""
+        if first_kept == len(messages):
+            return None
 
-        # Générer un résumé intelligent
-        summary = self._generate_summary_sync(old_messages)
+        return old_messages, messages[first_kept]
+
+    def _apply_compaction(self, summary: str, first_kept: Message) -> str | None:
+        """
+        Remplace l'historique avant first_kept par le résumé.
 
-        # Reconstruire
+        Returns:
+            Message à afficher, ou None si first_kept n'est plus dans l'historique
+        """
+        # Recherche par identité : l'historique a pu grandir (ou être coupé) depuis
+        cut = next((i for i, m in enumerate(self.messages) if m is first_kept), None)
+        if cut is None or cut < 1:
+            return None
+
+        # Remplacer l'historique ancien par le résumé (les récents restent tels quels)
         old_count = len(self.messages)
-        self.messages = [system_msg]
-        self.messages.append(Message(
+        self._splice_messages(1, cut, [Message(
             role="assistant",
             content=f"📝 **Résumé de la conversation précédente:**\n\n{summary}"
-        ))
-        self.messages.extend(recent)
+        )])
+
+        # Taille du contexte inconnue jusqu'à la prochaine requête.
+        # Le cumul (prompt_tokens) reste intact pour l'estimation du coût.
+        self.usage.last_prompt_tokens = 0
 
-        # Reset partiel des tokens (estimation)
-        self.usage.prompt_tokens = int(self.usage.prompt_tokens * 0.3)
+        return f"💾 Conversation compactée: {old_count} → {len(self.messages)} messages"
 
-        return True, f"💾 Conversation compactée: {old_count} → {len(self.messages)} messages"
+    def _schedule_auto_compact(self) -> None:
+        """
+        Lance le résumé dans un thread si le contexte dépasse le seuil.
+
+        Le thread utilise son propre provider (le cache de conversion du
+        provider principal n'est pas partagé entre threads) et est daemon :
+        une session headless qui se termine n'attend pas le résumé.
+        """
+        if self._pending_compact is not None or not self._should_auto_compact():
+            return
+
+        plan = self._plan_compaction()
+        if plan is None:
+            return
+        old_messages, first_kept = plan
+
+        future: Future = Future()
+        provider = self._create_provider()
+
+        def run() -> None:
+            try:
+                summary = self._generate_summary_sync(old_messages, provider)
+            except Exception:
+                summary = self._fallback_summary(old_messages)
+            future.set_result(summary)
+
+        self._pending_compact = (future, first_kept)
+        threading.Thread(target=run, name="therese-compact", daemon=True).start()
+
+    def _apply_pending_compact(self) -> str | None:
+        """Applique le compactage d'arrière-plan s'il est prêt (sans l'attendre)."""
+        pending = self._pending_compact
+        if pending is None or not pending[0].done():
+            return None
+        self._pending_compact = None
+        future, first_kept = pending
+        return self._apply_compaction(future.result(), first_kept)
+
+    def auto_compact(self) -> tuple[bool, str]:
+        """
+        Auto-compacte si nécessaire (synchrone). Utilise le LLM pour résumer.
+
+        Returns:
+            (compacted: bool, message: str)
+        """
+        if not self._should_auto_compact():
+            return False, ""
+
+        compact_msg = self._compact_now()
+        if compact_msg is None:
+            return False, ""
+        return True, compact_msg
+
+    def _compact_now(self) -> str | None:
+        """
+        Résume et remplace l'historique ancien, sans condition de seuil.
+
+        Returns:
+            Message à afficher, ou None si rien à compacter
+        """
+        plan = self._plan_compaction()
+        if plan is None:
+            return None
+        old_messages, first_kept = plan
+
+        # Un compactage d'arrière-plan éventuel devient caduc
+        self._pending_compact = None
+
+        # Générer un résumé intelligent
+        summary = self._generate_summary_sync(old_messages)
+        return self._apply_compaction(summary, first_kept)
 
     def compact(self) -> str:
         """Compacte manuellement la conversation avec résumé LLM."""
         if len(self.messages) <= 2:
             return "Conversation trop courte pour être compactée."
 
-        compacted, message = self.auto_compact()
-        if compacted:
-            return message
+        # Demande explicite : le seuil d'auto-compact ne s'applique pas
+        compact_msg = self._compact_now()
+        if compact_msg:
+            return compact_msg
         return "Rien à compacter."
 
     def get_stats(self) -> dict:
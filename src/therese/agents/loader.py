@@ -13,6 +13,33 @@ from typing import Any
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as _YamlLoader  # libyaml (C), si compilé
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Fichiers YAML déjà parsés : chemin -> (mtime_ns, taille, données)
+_parsed_files: dict[str, tuple[int, int, dict[str, Any]]] = {}
+
+
+def _load_yaml_file(path: Path) -> dict[str, Any]:
+    """
+    Parse un fichier YAML d'agent, en réutilisant le résultat tant que le
+    fichier n'a pas changé (mtime et taille).
+
+    Les données retournées sont partagées : ne pas les modifier.
+    """
+    stat = path.stat()
+    key = str(path)
+    cached = _parsed_files.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(path, encoding="utf-8") as f:
+        data = yaml.load(f, Loader=_YamlLoader)
+    _parsed_files[key] = (stat.st_mtime_ns, stat.st_size, data)
+    return data
+
 
 @dataclass
 class AgentConfig:
@@ -40,20 +67,21 @@ class AgentConfig:
     @classmethod
     def from_yaml(cls, path: Path) -> "AgentConfig":
         """Charge un agent depuis un fichier YAML."""
-        with open(path, encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+        data = _load_yaml_file(path)
 
+        # Copie des listes : les données parsées sont partagées par le cache
+        tools = data.get("tools")
         return cls(
             name=data.get("name", path.stem),
             description=data.get("description", ""),
             icon=data.get("icon", "🤖"),
             system_prompt=data.get("system_prompt", ""),
             model=data.get("model"),
-            tools=data.get("tools"),
-            mcp_servers=data.get("mcp_servers", []),
+            tools=list(tools) if tools is not None else None,
+            mcp_servers=list(data.get("mcp_servers") or []),
             author=data.get("author", ""),
             version=data.get("version", "1.0.0"),
-            tags=data.get("tags", []),
+            tags=list(data.get("tags") or []),
         )
 
     def to_yaml(self) -> str:
@@ -87,34 +115,59 @@ class AgentLoader:
         self.user_agents_dir = Path.home() / ".therese" / "agents"
         self.builtin_agents_dir = Path(__file__).parent / "builtin"
         self._cache: dict[str, AgentConfig] = {}
+        # Répertoire -> (mtime_ns, fichiers .yaml)
+        self._listings: dict[Path, tuple[int, list[Path]]] = {}
 
     def _ensure_dirs(self) -> None:
         """Crée les répertoires si nécessaires."""
         self.user_agents_dir.mkdir(parents=True, exist_ok=True)
 
+    def _yaml_files(self, directory: Path) -> list[Path]:
+        """
+        Fichiers *.yaml d'un répertoire (liste vide s'il n'existe pas).
+
+        Un seul scandir, relancé uniquement quand le mtime du répertoire
+        change (ajout, suppression ou renommage d'un agent).
+        """
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return []
+
+        cached = self._listings.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with os.scandir(directory) as entries:
+            files = [
+                Path(entry.path)
+                for entry in entries
+                if entry.name.endswith(".yaml") and entry.is_file()
+            ]
+        self._listings[directory] = (mtime, files)
+        return files
+
     def list_agents(self) -> list[AgentConfig]:
         """Liste tous les agents disponibles."""
         agents = []
 
         # Agents intégrés
-        if self.builtin_agents_dir.exists():
-            for yaml_file in self.builtin_agents_dir.glob("*.yaml"):
-                try:
-                    agent = AgentConfig.from_yaml(yaml_file)
-                    agent.tags.append("builtin")
-                    agents.append(agent)
-                except Exception:
-                    pass
+        for yaml_file in self._yaml_files(self.builtin_agents_dir):
+            try:
+                agent = AgentConfig.from_yaml(yaml_file)
+                agent.tags.append("builtin")
+                agents.append(agent)
+            except Exception:
+                pass
 
         # Agents utilisateur (priorité)
-        if self.user_agents_dir.exists():
-            for yaml_file in self.user_agents_dir.glob("*.yaml"):
-                try:
-                    agent = AgentConfig.from_yaml(yaml_file)
-                    agent.tags.append("user")
-                    agents.append(agent)
-                except Exception:
-                    pass
+        for yaml_file in self._yaml_files(self.user_agents_dir):
+            try:
+                agent = AgentConfig.from_yaml(yaml_file)
+                agent.tags.append("user")
+                agents.append(agent)
+            except Exception:
+                pass
 
         return agents
 
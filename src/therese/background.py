@@ -6,13 +6,26 @@ Permet d'exécuter des commandes longues en arrière-plan
 """
 
 import asyncio
+import functools
+import io
+import os
+import secrets
+import signal
 import subprocess
-import uuid
+import time
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from typing import Callable
 
+# Le shell est lancé dans son propre groupe de processus : un kill atteint
+# aussi les commandes qu'il a forkées (npm, webpack...), pas seulement `sh`
+if os.name == "nt":
+    _SPAWN_KWARGS: dict = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    _SPAWN_KWARGS = {"start_new_session": True}
+
 
 class TaskStatus(Enum):
     """État d'une tâche."""
@@ -23,7 +36,14 @@ class TaskStatus(Enum):
     CANCELLED = "cancelled"
 
 
-@dataclass
+# Ensembles précalculés pour les tests d'état (une recherche de hash)
+_ACTIVE: frozenset[TaskStatus] = frozenset({TaskStatus.PENDING, TaskStatus.RUNNING})
+_TERMINAL: frozenset[TaskStatus] = frozenset(
+    {TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED}
+)
+
+
+@dataclass(slots=True)
 class BackgroundTask:
     """Une tâche en arrière-plan."""
     id: str
@@ -32,10 +52,31 @@ class BackgroundTask:
     created_at: datetime = field(default_factory=datetime.now)
     started_at: datetime | None = None
     completed_at: datetime | None = None
-    output: str = ""
+    # Horloge monotone pour les durées (les datetime ne servent qu'à l'affichage)
+    started_monotonic: float | None = None
+    completed_monotonic: float | None = None
     error: str = ""
     return_code: int | None = None
-    process: subprocess.Popen | None = field(default=None, repr=False)
+    process: asyncio.subprocess.Process | None = field(default=None, repr=False)
+    # Dernières lignes (stdout et stderr entrelacés) : la mémoire reste bornée
+    # quelle que soit la verbosité de la commande
+    _output_lines: deque[str] = field(
+        default_factory=lambda: deque(maxlen=BackgroundTaskManager.MAX_OUTPUT_LINES),
+        repr=False,
+    )
+    line_count: int = 0  # Total de lignes reçues (y compris celles évincées)
+    bytes_seen: int = 0  # Octets reçus (stdout + stderr)
+    # Valeurs d'affichage figées : calculées une fois au lieu de chaque rendu
+    _created_at_str: str = field(default="", init=False, repr=False)
+    _duration_cache: str | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._created_at_str = self.created_at.strftime("%H:%M:%S")
+
+    @property
+    def output(self) -> str:
+        """Output conservé (jointure faite uniquement à la demande)."""
+        return "\n".join(self._output_lines)
 
     def to_dict(self) -> dict:
         """Convertit en dict pour affichage."""
@@ -43,18 +84,30 @@ class BackgroundTask:
             "id": self.id,
             "command": self.command,
             "status": self.status.value,
-            "created_at": self.created_at.strftime("%H:%M:%S"),
+            "created_at": self._created_at_str,
             "duration": self._get_duration(),
-            "output_lines": len(self.output.split("\n")) if self.output else 0,
+            "output_lines": self.line_count,
         }
 
+    def _mark_completed(self) -> None:
+        """Fige la fin de la tâche (la durée ne bougera plus)."""
+        self.completed_at = datetime.now()
+        self.completed_monotonic = time.monotonic()
+        self._duration_cache = self._compute_duration()
+
     def _get_duration(self) -> str:
+        """Durée de la tâche (mémorisée une fois la tâche terminée)."""
+        if self._duration_cache is not None:
+            return self._duration_cache
+        return self._compute_duration()
+
+    def _compute_duration(self) -> str:
         """Calcule la durée de la tâche."""
-        if self.started_at is None:
+        if self.started_monotonic is None:
             return "n/a"
 
-        end_time = self.completed_at or datetime.now()
-        duration = (end_time - self.started_at).total_seconds()
+        end = self.completed_monotonic or time.monotonic()
+        duration = end - self.started_monotonic
 
         if duration < 60:
             return f"{int(duration)}s"
@@ -79,14 +132,22 @@ class BackgroundTaskManager:
 
     MAX_TASKS = 10  # Limite de tâches simultanées
     MAX_OUTPUT_LINES = 100  # Lignes d'output gardées en mémoire
+    MAX_OUTPUT_BYTES = 10 * 1024 * 1024  # Au-delà, l'output est lu (drainé) mais plus décodé
+    MAX_COMPLETED_TASKS = 20  # Tâches terminées conservées dans l'historique
+    MAX_TASK_DURATION = 1800  # Secondes avant d'abandonner une tâche bloquée
+    KILL_GRACE_PERIOD = 5.0  # Secondes laissées après SIGTERM avant SIGKILL
 
     def __init__(self):
+        # Ordre d'insertion = ordre de création (pas besoin de trier)
         self._tasks: dict[str, BackgroundTask] = {}
-        self._lock = asyncio.Lock()
+        # IDs des tâches terminées, de la plus ancienne à la plus récente
+        self._completed_order: deque[str] = deque()
+        # Tâches lancées et pas encore terminées (processus encore vivant compris)
+        self._active_count = 0
 
     def _generate_id(self) -> str:
         """Génère un ID court unique."""
-        return f"bg_{uuid.uuid4().hex[:6]}"
+        return f"bg_{secrets.token_hex(3)}"
 
     async def run(
         self,
@@ -105,15 +166,11 @@ class BackgroundTaskManager:
         Returns:
             (success, message) avec l'ID de la tâche si succès
         """
-        async with self._lock:
-            # Nettoyer les anciennes tâches terminées
-            self._cleanup_old_tasks()
-
-            # Vérifier la limite
-            running = [t for t in self._tasks.values()
-                      if t.status in (TaskStatus.PENDING, TaskStatus.RUNNING)]
-            if len(running) >= self.MAX_TASKS:
-                return False, f"Limite de {self.MAX_TASKS} tâches atteinte"
+        # Vérifier la limite : section synchrone (aucun await entre le test et
+        # l'incrément), donc atomique dans la boucle asyncio sans verrou
+        if self._active_count >= self.MAX_TASKS:
+            return False, f"Limite de {self.MAX_TASKS} tâches atteinte"
+        self._active_count += 1
 
         task_id = self._generate_id()
         task = BackgroundTask(id=task_id, command=command)
@@ -131,8 +188,15 @@ class BackgroundTaskManager:
         on_complete: Callable[[BackgroundTask], None] | None,
     ) -> None:
         """Exécute une tâche de manière asynchrone."""
+        if task.status == TaskStatus.CANCELLED:
+            # Annulée avant même d'avoir démarré
+            task._mark_completed()
+            self._record_completed(task)
+            return
+
         task.status = TaskStatus.RUNNING
         task.started_at = datetime.now()
+        task.started_monotonic = time.monotonic()
 
         try:
             process = await asyncio.create_subprocess_shell(
@@ -140,34 +204,134 @@ class BackgroundTaskManager:
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 cwd=working_dir,
+                **_SPAWN_KWARGS,
             )
+            task.process = process
+
+            try:
+                task.return_code = await asyncio.wait_for(
+                    self._pump_and_wait(process, task),
+                    timeout=self.MAX_TASK_DURATION,
+                )
+            except TimeoutError:
+                # Tâche bloquée : libérer le slot (le processus est tué dans le finally)
+                task.status = TaskStatus.FAILED
+                task.error = f"timeout après {self.MAX_TASK_DURATION}s"
+                return
 
-            # Lire l'output en streaming
-            stdout, stderr = await process.communicate()
-
-            task.output = stdout.decode("utf-8", errors="replace")
-            task.error = stderr.decode("utf-8", errors="replace")
-            task.return_code = process.returncode
-
-            if task.return_code == 0:
+            if task.status == TaskStatus.CANCELLED:
+                pass  # Tuée via kill() : garder le statut
+            elif task.return_code == 0:
                 task.status = TaskStatus.COMPLETED
             else:
                 task.status = TaskStatus.FAILED
 
         except asyncio.CancelledError:
             task.status = TaskStatus.CANCELLED
+            raise
         except Exception as e:
             task.status = TaskStatus.FAILED
             task.error = str(e)
 
         finally:
-            task.completed_at = datetime.now()
+            # Ne jamais laisser un processus orphelin (annulation, erreur de lecture...)
+            if task.process is not None:
+                await self._stop_process(task.process, self.KILL_GRACE_PERIOD)
+                task.process = None
+            task._mark_completed()
+            self._record_completed(task)
             if on_complete:
                 on_complete(task)
 
-    def kill(self, task_id: str) -> tuple[bool, str]:
+    async def _pump_and_wait(
+        self,
+        process: asyncio.subprocess.Process,
+        task: BackgroundTask,
+    ) -> int:
+        """Lit l'output en streaming, ligne par ligne, puis attend la fin du processus."""
+        await asyncio.gather(
+            self._read_lines(process.stdout, task),
+            self._read_lines(process.stderr, task),
+        )
+        return await process.wait()
+
+    async def _read_lines(self, stream: asyncio.StreamReader, task: BackgroundTask) -> None:
+        """
+        Ajoute chaque ligne du flux à l'output (borné) de la tâche.
+
+        Passé MAX_OUTPUT_BYTES, le flux continue d'être lu pour ne pas bloquer
+        le processus sur un pipe plein, mais les lignes ne sont plus décodées.
         """
-        Tue une tâche en cours.
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                # Ligne plus longue que la limite du StreamReader (déjà consommée)
+                line = "[ligne trop longue ignorée]\n".encode()
+            if not line:
+                break
+            task.line_count += 1
+            if task.bytes_seen > self.MAX_OUTPUT_BYTES:
+                continue
+            task.bytes_seen += len(line)
+            if task.bytes_seen > self.MAX_OUTPUT_BYTES:
+                task._output_lines.append("... [output tronqué]")
+                continue
+            task._output_lines.append(line.decode("utf-8", errors="replace").rstrip("\r\n"))
+
+    @staticmethod
+    def _signal_group(process: asyncio.subprocess.Process, force: bool) -> None:
+        """Envoie SIGTERM (ou SIGKILL si `force`) à tout le groupe du processus."""
+        if os.name == "nt":
+            if force:
+                process.kill()
+            else:
+                process.send_signal(signal.CTRL_BREAK_EVENT)
+            return
+        # Lancé avec start_new_session : le PID du shell est aussi le PGID
+        os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+
+    @staticmethod
+    def _group_alive(process: asyncio.subprocess.Process) -> bool:
+        """Indique s'il reste au moins un processus dans le groupe de la tâche."""
+        if os.name == "nt":
+            return process.returncode is None
+        try:
+            os.killpg(process.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass  # Le groupe existe, mais un membre a changé d'utilisateur
+        return True
+
+    @classmethod
+    async def _stop_process(cls, process: asyncio.subprocess.Process, grace: float) -> None:
+        """Termine un processus et ses enfants (SIGTERM, puis SIGKILL après `grace` secondes)."""
+        # Même si le shell est déjà sorti, des enfants (`cmd &`, nohup) peuvent
+        # survivre dans le groupe : on signale toujours le groupe entier
+        try:
+            cls._signal_group(process, force=False)
+        except ProcessLookupError:
+            await process.wait()
+            return  # Plus aucun processus dans le groupe
+
+        deadline = time.monotonic() + grace
+        try:
+            await asyncio.wait_for(process.wait(), grace)
+        except TimeoutError:
+            pass
+        while cls._group_alive(process) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        try:
+            cls._signal_group(process, force=True)
+        except ProcessLookupError:
+            pass  # Tout le groupe s'est arrêté sur SIGTERM
+        await process.wait()
+
+    async def kill(self, task_id: str) -> tuple[bool, str]:
+        """
+        Tue une tâche en cours (et son processus).
 
         Returns:
             (success, message)
@@ -176,14 +340,12 @@ class BackgroundTaskManager:
         if not task:
             return False, f"Tâche `{task_id}` non trouvée"
 
-        if task.status not in (TaskStatus.PENDING, TaskStatus.RUNNING):
+        if task.status in _TERMINAL:
             return False, f"Tâche `{task_id}` déjà terminée ({task.status.value})"
 
         task.status = TaskStatus.CANCELLED
-        task.completed_at = datetime.now()
-
-        # Note: Le vrai kill du process nécessiterait de stocker le process
-        # Pour l'instant on marque juste comme cancelled
+        if task.process is not None:
+            await self._stop_process(task.process, self.KILL_GRACE_PERIOD)
 
         return True, f"Tâche `{task_id}` annulée"
 
@@ -199,15 +361,15 @@ class BackgroundTaskManager:
             include_completed: Inclure les tâches terminées
 
         Returns:
-            Liste de tâches triées par date de création
+            Liste de tâches, la plus récente en premier
         """
-        tasks = list(self._tasks.values())
+        tasks = reversed(self._tasks.values())
 
         if not include_completed:
-            tasks = [t for t in tasks
-                    if t.status in (TaskStatus.PENDING, TaskStatus.RUNNING)]
+            return [t for t in tasks
+                    if t.status in _ACTIVE]
 
-        return sorted(tasks, key=lambda t: t.created_at, reverse=True)
+        return list(tasks)
 
     def get_output(self, task_id: str, tail: int = 50) -> str:
         """
@@ -224,24 +386,22 @@ class BackgroundTaskManager:
         if not task:
             return f"Tâche `{task_id}` non trouvée"
 
-        lines = (task.output + task.error).strip().split("\n")
-        if len(lines) > tail:
-            lines = lines[-tail:]
+        # Les `tail` dernières lignes, message d'erreur compris, sans concaténation
+        lines = deque(task._output_lines, maxlen=max(tail, 0))
+        lines.extend(task.error.splitlines())
 
         return "\n".join(lines) if lines else "(pas d'output)"
 
-    def _cleanup_old_tasks(self) -> None:
-        """Supprime les anciennes tâches terminées (garder les 20 dernières)."""
-        completed = [
-            t for t in self._tasks.values()
-            if t.status in (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
-        ]
+    def _record_completed(self, task: BackgroundTask) -> None:
+        """
+        Enregistre une tâche terminée et libère son slot.
 
-        if len(completed) > 20:
-            # Trier par date et supprimer les plus anciennes
-            completed.sort(key=lambda t: t.completed_at or t.created_at)
-            for task in completed[:-20]:
-                del self._tasks[task.id]
+        Évince la plus ancienne des tâches terminées (garder les 20 dernières).
+        """
+        self._active_count -= 1
+        self._completed_order.append(task.id)
+        if len(self._completed_order) > self.MAX_COMPLETED_TASKS:
+            self._tasks.pop(self._completed_order.popleft(), None)
 
     def to_markdown(self) -> str:
         """Formate les tâches en Markdown."""
@@ -267,39 +427,25 @@ Aucune tâche en cours.
             TaskStatus.CANCELLED: "⛔",
         }
 
-        lines = [
-            "# Background Tasks",
-            "",
-            "| ID | Statut | Commande | Durée |",
-            "|---|---|---|---|",
-        ]
+        buf = io.StringIO()
+        buf.write("# Background Tasks\n\n| ID | Statut | Commande | Durée |\n|---|---|---|---|\n")
 
         for task in tasks[:10]:  # Max 10 dans le tableau
             icon = status_icons.get(task.status, "?")
             cmd = task.command[:30] + "..." if len(task.command) > 30 else task.command
             duration = task._get_duration()
-            lines.append(f"| `{task.id}` | {icon} {task.status.value} | `{cmd}` | {duration} |")
+            buf.write(f"| `{task.id}` | {icon} {task.status.value} | `{cmd}` | {duration} |\n")
 
-        running = len([t for t in tasks if t.status == TaskStatus.RUNNING])
+        running = sum(1 for t in tasks if t.status == TaskStatus.RUNNING)
         if running > 0:
-            lines.append("")
-            lines.append(f"**{running} tâche(s) en cours**")
-
-        lines.extend([
-            "",
-            "**Commands:** `/kill <id>` `/output <id>`",
-        ])
-
-        return "\n".join(lines)
+            buf.write(f"\n**{running} tâche(s) en cours**\n")
 
+        buf.write("\n**Commands:** `/kill <id>` `/output <id>`")
 
-# Instance globale (singleton)
-_manager: BackgroundTaskManager | None = None
+        return buf.getvalue()
 
 
+@functools.cache
 def get_background_manager() -> BackgroundTaskManager:
     """Récupère le gestionnaire de tâches background (singleton)."""
-    global _manager
-    if _manager is None:
-        _manager = BackgroundTaskManager()
-    return _manager
+    return BackgroundTaskManager()
@@ -4,7 +4,12 @@ Checkpoint Manager pour THERESE CLI.
 Gère la création, restauration et listing des checkpoints.
 """
 
-import uuid
+import functools
+import io
+import itertools
+import os
+import secrets
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
@@ -12,8 +17,13 @@ from typing import Iterator
 
 from .storage import StorageBase, GitStashStorage, FileStorage, CheckpointData
 
+try:
+    import pygit2
+except ImportError:  # pygit2 est optionnel (extra "fast") : repli sur `git status`
+    pygit2 = None
 
-@dataclass
+
+@dataclass(slots=True)
 class Checkpoint:
     """Un checkpoint."""
     id: str
@@ -49,12 +59,33 @@ class CheckpointManager:
 
     MAX_AUTO_CHECKPOINTS = 20  # Garder les N derniers auto-checkpoints
     MAX_NAMED_CHECKPOINTS = 50  # Garder les N derniers checkpoints nommés
+    _CACHE_TTL = 2.0  # Secondes pendant lesquelles la liste du storage est réutilisée
+    MAX_RECENT_FILES = 100  # Limite du fallback sans git
+
+    # Fallback sans git : extensions surveillées et dossiers ignorés
+    _RECENT_EXTENSIONS = frozenset(
+        {".py", ".js", ".ts", ".jsx", ".tsx", ".json", ".yaml", ".yml", ".md"}
+    )
+    _SKIPPED_DIRS = frozenset({".git", "node_modules", "__pycache__", ".venv", "venv"})
 
     def __init__(self, working_dir: Path):
         self.working_dir = working_dir
         self._storage = self._detect_storage()
-        self._modified_files: set[Path] = set()  # Fichiers modifiés depuis dernier checkpoint
+        # Fichiers modifiés depuis dernier checkpoint (chemins absolus normalisés)
+        self._modified_files: set[str] = set()
+        # Préfixes du projet (avec séparateur final : /proj-other ne passe pas
+        # pour /proj). Le test d'appartenance se fait sur le chemin résolu ;
+        # les fichiers suivis sont ré-enracinés sous working_dir tel quel
+        # (le storage archive par chemin relatif à working_dir)
+        self._working_dir_prefix = os.path.join(os.path.abspath(working_dir), "")
+        self._resolved_prefix = os.path.join(os.fspath(Path(working_dir).resolve()), "")
         self._last_auto_cp_id: str | None = None
+        # (instant monotonic, liste triée du storage) : évite de relire l'index
+        # plusieurs fois pour un même rewind / affichage
+        self._list_cache: tuple[float, list[CheckpointData]] | None = None
+        # Lignes Markdown déjà formatées, par ID (un checkpoint ne change pas)
+        self._row_cache: dict[str, str] = {}
+        self._repo = None  # pygit2.Repository ouvert à la demande
 
     def _detect_storage(self) -> StorageBase:
         """Détecte le storage approprié (git ou fichiers)."""
@@ -63,6 +94,19 @@ class CheckpointManager:
             return git_storage
         return FileStorage(self.working_dir)
 
+    def _cached_list(self) -> list[CheckpointData]:
+        """Liste du storage (triée par date décroissante), mise en cache quelques secondes."""
+        now = time.monotonic()
+        if self._list_cache is not None and now - self._list_cache[0] < self._CACHE_TTL:
+            return self._list_cache[1]
+        checkpoints = self._storage.list_checkpoints()
+        self._list_cache = (now, checkpoints)
+        return checkpoints
+
+    def _invalidate_cache(self) -> None:
+        """Invalide la liste en cache (après une modification du storage)."""
+        self._list_cache = None
+
     @property
     def storage_type(self) -> str:
         """Retourne le type de storage utilisé."""
@@ -72,19 +116,21 @@ class CheckpointManager:
 
     def _generate_id(self) -> str:
         """Génère un ID unique pour un checkpoint."""
-        return f"cp_{uuid.uuid4().hex[:8]}"
+        return f"cp_{secrets.token_hex(4)}"
 
     def track_file(self, file_path: Path | str) -> None:
-        """Marque un fichier comme modifié (pour auto-checkpoint)."""
-        path = Path(file_path) if isinstance(file_path, str) else file_path
-        if path.is_relative_to(self.working_dir):
-            self._modified_files.add(path)
-        else:
-            # Chemin absolu - essayer de le rendre relatif
-            try:
-                self._modified_files.add(path)
-            except ValueError:
-                pass
+        """
+        Marque un fichier comme modifié (pour auto-checkpoint).
+
+        Le chemin est résolu comme le font write_file / edit_file (relatif au
+        répertoire courant du processus). Un fichier hors du projet n'est pas
+        suivi : le storage ne sait archiver que des fichiers du working_dir.
+        """
+        path = os.fspath(Path(file_path).expanduser().resolve())
+        if path.startswith(self._resolved_prefix):
+            self._modified_files.add(
+                self._working_dir_prefix + path[len(self._resolved_prefix):]
+            )
 
     def create(
         self,
@@ -115,7 +161,11 @@ class CheckpointManager:
 
         # Fichiers à inclure
         if files is None:
-            files = list(self._modified_files) if self._modified_files else self._get_modified_files()
+            if self._modified_files:
+                # Le storage manipule des Path (exists, relative_to)
+                files = [Path(f) for f in self._modified_files]
+            else:
+                files = self._get_modified_files()
 
         if not files:
             return None  # Rien à sauvegarder
@@ -130,6 +180,7 @@ class CheckpointManager:
         )
 
         success = self._storage.save(checkpoint_data, files)
+        self._invalidate_cache()
         if not success:
             return None
 
@@ -146,21 +197,33 @@ class CheckpointManager:
         """Récupère les fichiers modifiés dans le working_dir."""
         # Pour git, on peut utiliser git status
         if isinstance(self._storage, GitStashStorage):
+            if pygit2 is not None:
+                try:
+                    return self._get_modified_files_pygit2()
+                except Exception:
+                    pass  # Repli sur le sous-processus git
+
             import subprocess
             try:
+                # -z : entrées séparées par NUL, chemins bruts (ni guillemets ni échappements)
                 result = subprocess.run(
-                    ["git", "status", "--porcelain"],
+                    ["git", "status", "-z", "--porcelain"],
                     cwd=self.working_dir,
                     capture_output=True,
-                    text=True,
                 )
                 if result.returncode == 0:
                     files = []
-                    for line in result.stdout.strip().split("\n"):
-                        if line.strip():
-                            # Format: XY filename
-                            filename = line[3:].strip()
-                            files.append(self.working_dir / filename)
+                    entries = iter(result.stdout.split(b"\0"))
+                    for entry in entries:
+                        # Format: XY filename
+                        if len(entry) > 3:
+                            # Renommage/copie : l'ancien chemin suit dans sa propre entrée
+                            if entry[:1] in (b"R", b"C"):
+                                next(entries, None)
+                            # Fichier supprimé : plus rien à sauvegarder
+                            elif not entry[:2].strip(b" D"):
+                                continue
+                            files.append(self.working_dir / os.fsdecode(entry[3:]))
                     return files
             except Exception:
                 pass
@@ -169,20 +232,48 @@ class CheckpointManager:
         # (dans les 10 dernières minutes)
         from datetime import timedelta
         cutoff = datetime.now() - timedelta(minutes=10)
-        files = []
+        cutoff_ts = cutoff.timestamp()
+        files: list[Path] = []
 
-        extensions = {".py", ".js", ".ts", ".jsx", ".tsx", ".json", ".yaml", ".yml", ".md"}
-        for ext in extensions:
-            for f in self.working_dir.rglob(f"*{ext}"):
-                if f.is_file():
-                    try:
-                        mtime = datetime.fromtimestamp(f.stat().st_mtime)
-                        if mtime > cutoff:
-                            files.append(f)
-                    except Exception:
-                        pass
+        # Un seul parcours (scandir : type et stat sans appel système superflu)
+        stack = [str(self.working_dir)]
+        while stack and len(files) < self.MAX_RECENT_FILES:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name not in self._SKIPPED_DIRS:
+                                    stack.append(entry.path)
+                            elif (
+                                os.path.splitext(entry.name)[1] in self._RECENT_EXTENSIONS
+                                and entry.is_file()
+                                and entry.stat().st_mtime > cutoff_ts
+                            ):
+                                files.append(Path(entry.path))
+                        except OSError:
+                            pass
+            except OSError:
+                pass
 
-        return files[:100]  # Limiter à 100 fichiers
+        return files[:self.MAX_RECENT_FILES]
+
+    def _get_modified_files_pygit2(self) -> list[Path]:
+        """Équivalent de `git status` en processus (libgit2, sans fork)."""
+        if self._repo is None:
+            self._repo = pygit2.Repository(str(self.working_dir))
+        # Suppressions seules (dont l'ancien chemin d'un renommage) : comme
+        # avec `git status -z`, seuls les fichiers présents sont retenus
+        skipped = (
+            pygit2.GIT_STATUS_IGNORED
+            | pygit2.GIT_STATUS_WT_DELETED
+            | pygit2.GIT_STATUS_INDEX_DELETED
+        )
+        return [
+            self.working_dir / path
+            for path, flags in self._repo.status().items()
+            if flags & ~skipped
+        ]
 
     def auto_checkpoint(self, before_action: str = "") -> Checkpoint | None:
         """
@@ -220,7 +311,9 @@ class CheckpointManager:
                 else:
                     return False
 
-        return self._storage.restore(checkpoint_id)
+        success = self._storage.restore(checkpoint_id)
+        self._invalidate_cache()
+        return success
 
     def rewind(self) -> tuple[bool, str]:
         """
@@ -257,28 +350,40 @@ class CheckpointManager:
         Returns:
             Liste de checkpoints triés par date décroissante
         """
-        all_checkpoints = self._storage.list_checkpoints()
+        return [
+            Checkpoint.from_data(cp)
+            for cp in itertools.islice(self._iter_checkpoints(auto_only, named_only), limit)
+        ]
 
+    def _iter_checkpoints(
+        self,
+        auto_only: bool = False,
+        named_only: bool = False,
+    ) -> Iterator[CheckpointData]:
+        """Parcourt la liste en cache (déjà triée par date décroissante) avec filtre."""
+        checkpoints = self._cached_list()
         if auto_only:
-            all_checkpoints = [cp for cp in all_checkpoints if cp.is_auto]
-        elif named_only:
-            all_checkpoints = [cp for cp in all_checkpoints if not cp.is_auto]
-
-        return [Checkpoint.from_data(cp) for cp in all_checkpoints[:limit]]
+            return (cp for cp in checkpoints if cp.is_auto)
+        if named_only:
+            return (cp for cp in checkpoints if not cp.is_auto)
+        return iter(checkpoints)
 
     def get_latest(self) -> Checkpoint | None:
         """Retourne le dernier checkpoint."""
-        checkpoints = self.list_checkpoints(limit=1)
-        return checkpoints[0] if checkpoints else None
+        checkpoints = self._cached_list()
+        return Checkpoint.from_data(checkpoints[0]) if checkpoints else None
 
     def get_latest_auto(self) -> Checkpoint | None:
         """Retourne le dernier auto-checkpoint."""
-        checkpoints = self.list_checkpoints(auto_only=True, limit=1)
-        return checkpoints[0] if checkpoints else None
+        latest = next((cp for cp in self._cached_list() if cp.is_auto), None)
+        return Checkpoint.from_data(latest) if latest else None
 
     def delete(self, checkpoint_id: str) -> bool:
         """Supprime un checkpoint."""
-        return self._storage.delete(checkpoint_id)
+        success = self._storage.delete(checkpoint_id)
+        self._row_cache.pop(checkpoint_id, None)
+        self._invalidate_cache()
+        return success
 
     def _cleanup_old_checkpoints(self, auto_only: bool = False) -> int:
         """
@@ -294,19 +399,21 @@ class CheckpointManager:
             checkpoints = self.list_checkpoints(limit=1000)
             max_keep = self.MAX_AUTO_CHECKPOINTS + self.MAX_NAMED_CHECKPOINTS
 
-        deleted = 0
-        if len(checkpoints) > max_keep:
-            # Supprimer les plus anciens
-            to_delete = checkpoints[max_keep:]
-            for cp in to_delete:
-                if self.delete(cp.id):
-                    deleted += 1
+        if len(checkpoints) <= max_keep:
+            return 0
+
+        # Supprimer les plus anciens, en un seul passage sur le storage
+        ids = [cp.id for cp in checkpoints[max_keep:]]
+        deleted = self._storage.delete_many(ids)
+        for cp_id in ids:
+            self._row_cache.pop(cp_id, None)
+        self._invalidate_cache()
 
         return deleted
 
     def to_markdown(self) -> str:
         """Formate les checkpoints en Markdown."""
-        checkpoints = self.list_checkpoints(limit=10)
+        checkpoints = self._cached_list()[:10]
 
         if not checkpoints:
             return """# 📸 Checkpoints
@@ -319,41 +426,38 @@ Aucun checkpoint disponible.
 - `Esc Esc` - Quick rewind (dernier auto)
 """
 
-        lines = [
-            "# 📸 Checkpoints",
-            "",
-            f"**Storage:** `{self.storage_type}`",
-            "",
-            "| ID | Nom | Date | Type |",
-            "|---|---|---|---|",
-        ]
-
+        buf = io.StringIO()
+        buf.write(
+            f"# 📸 Checkpoints\n\n**Storage:** `{self.storage_type}`\n\n"
+            "| ID | Nom | Date | Type |\n|---|---|---|---|\n"
+        )
         for cp in checkpoints:
-            cp_type = "🔄 auto" if cp.is_auto else "📌 named"
-            time_str = cp.timestamp.strftime("%d/%m %H:%M")
-            lines.append(f"| `{cp.id}` | {cp.name} | {time_str} | {cp_type} |")
+            buf.write(self._markdown_row(cp))
+            buf.write("\n")
+        buf.write("\n**Usage:** `/rewind <id>` ou `Esc Esc` pour quick rewind")
 
-        lines.extend([
-            "",
-            "**Usage:** `/rewind <id>` ou `Esc Esc` pour quick rewind",
-        ])
+        return buf.getvalue()
 
-        return "\n".join(lines)
+    def _markdown_row(self, cp: CheckpointData) -> str:
+        """Ligne du tableau Markdown pour un checkpoint (formatée une seule fois)."""
+        row = self._row_cache.get(cp.id)
+        if row is None:
+            cp_type = "🔄 auto" if cp.is_auto else "📌 named"
+            time_str = cp.timestamp.strftime("%d/%m %H:%M")
+            row = self._row_cache[cp.id] = f"| `{cp.id}` | {cp.name} | {time_str} | {cp_type} |"
+        return row
 
 
-# Instance globale (lazy)
-_manager: CheckpointManager | None = None
+@functools.lru_cache(maxsize=8)
+def _manager_for(working_dir: str) -> CheckpointManager:
+    """Instance par working_dir (chemin absolu normalisé)."""
+    return CheckpointManager(Path(working_dir))
 
 
 def get_checkpoint_manager(working_dir: Path | None = None) -> CheckpointManager:
     """Récupère le gestionnaire de checkpoints (singleton par working_dir)."""
-    global _manager
-
     if working_dir is None:
         from ..config import config
         working_dir = config.working_dir
 
-    if _manager is None or _manager.working_dir != working_dir:
-        _manager = CheckpointManager(working_dir)
-
-    return _manager
+    return _manager_for(os.path.abspath(working_dir))
@@ -3,11 +3,13 @@ Storage backends pour les checkpoints.
 
 Deux backends :
 - GitStashStorage : utilise git stash (si repo git)
-- FileStorage : archive tar.gz (fallback)
+- FileStorage : archive tar.zst (si zstandard est installé) ou tar.gz (fallback)
 """
 
+import functools
 import hashlib
 import json
+import os
 import shutil
 import subprocess
 import tarfile
@@ -17,6 +19,51 @@ from datetime import datetime
 from pathlib import Path
 from typing import Iterator
 
+try:
+    import orjson
+
+    def _dumps_index(index: dict) -> bytes:
+        """Sérialise l'index (orjson)."""
+        return orjson.dumps(index, option=orjson.OPT_INDENT_2)
+
+    def _dumps_line(op: dict) -> bytes:
+        """Sérialise une opération du journal sur une seule ligne (orjson)."""
+        return orjson.dumps(op, option=orjson.OPT_APPEND_NEWLINE)
+
+    _loads_index = orjson.loads
+except ImportError:  # orjson est optionnel (extra "fast")
+    def _dumps_index(index: dict) -> bytes:
+        """Sérialise l'index (json de la stdlib)."""
+        return json.dumps(index, indent=2).encode()
+
+    def _dumps_line(op: dict) -> bytes:
+        """Sérialise une opération du journal sur une seule ligne (json de la stdlib)."""
+        return json.dumps(op, separators=(",", ":")).encode() + b"\n"
+
+    _loads_index = json.loads
+
+try:
+    import pygit2
+except ImportError:  # pygit2 est optionnel (extra "fast") : sous-processus git
+    pygit2 = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard est optionnel (extra "fast") : archives tar.gz
+    zstandard = None
+
+
+# Tampon des archives : le défaut de tarfile (16 Kio) multiplie les appels
+# système et les copies Python sur les gros fichiers
+ARCHIVE_BUFSIZE = 2 * 1024 * 1024
+
+
+@functools.cache
+def _pigz_pipeline() -> tuple[str, str] | None:
+    """Chemins de `tar` et `pigz` s'ils sont tous deux installés (sinon None)."""
+    tar, pigz = shutil.which("tar"), shutil.which("pigz")
+    return (tar, pigz) if tar and pigz else None
+
 
 @dataclass
 class CheckpointData:
@@ -52,8 +99,158 @@ class StorageBase(ABC):
         """Supprime un checkpoint."""
         ...
 
+    def delete_many(self, checkpoint_ids: list[str]) -> int:
+        """
+        Supprime plusieurs checkpoints.
+
+        Implémentation par défaut : un `delete` par ID. Les backends à index
+        la surchargent pour ne lire et réécrire l'index qu'une fois.
+
+        Returns:
+            Nombre de checkpoints supprimés
+        """
+        return sum(1 for cp_id in checkpoint_ids if self.delete(cp_id))
 
-class GitStashStorage(StorageBase):
+
+class IndexedStorage(StorageBase):
+    """
+    Base des storages décrits par un index JSON.
+
+    L'index est stocké en deux fichiers :
+    - `_index_file` : instantané complet, remplacé atomiquement (os.replace)
+    - `_index_log` : journal JSONL en ajout seul ({"op": "add"|"del", ...})
+
+    Un ajout ou une suppression n'écrit qu'une ligne au journal au lieu de
+    réécrire tout l'index ; le journal est replié dans l'instantané quand il
+    devient plus long que l'index lui-même. L'index reconstruit est gardé en
+    mémoire tant que les deux fichiers ne changent pas (mtime_ns, taille).
+
+    `index["checkpoints"]` est un dict {id: entrée} (accès direct par ID).
+    Le dict retourné par `_load_index` est partagé avec le cache : il ne doit
+    être modifié que via `_append_index`.
+    """
+
+    COMPACT_MIN_OPS = 64  # Taille de journal en dessous de laquelle on ne compacte pas
+
+    _index_file: Path
+
+    def __init__(self) -> None:
+        self._index_cache: dict | None = None
+        self._index_stat: tuple | None = None
+        self._log_ops = 0  # Opérations dans le journal (depuis le dernier instantané)
+        self._log_damaged = False  # Ligne illisible : ne plus ajouter derrière
+
+    @property
+    def _index_log(self) -> Path:
+        """Journal des opérations, à côté de l'instantané."""
+        return self._index_file.with_suffix(".jsonl")
+
+    def _stat_key(self) -> tuple:
+        """(mtime_ns, taille) de l'instantané et du journal (None si absent)."""
+        key = []
+        for path in (self._index_file, self._index_log):
+            try:
+                st = path.stat()
+                key.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                key.append(None)
+        return tuple(key)
+
+    @staticmethod
+    def _apply_op(checkpoints: dict, op: dict) -> None:
+        """Applique une opération du journal (idempotente)."""
+        if op.get("op") == "add":
+            checkpoints[op["cp"]["id"]] = op["cp"]
+        elif op.get("op") == "del":
+            checkpoints.pop(op["id"], None)
+
+    def _load_index(self) -> dict:
+        """Charge l'index des checkpoints (instantané + rejeu du journal)."""
+        key = self._stat_key()
+        if self._index_cache is not None and key == self._index_stat:
+            return self._index_cache
+
+        index = {"checkpoints": {}}
+        if key[0] is not None:
+            index = _loads_index(self._index_file.read_bytes())
+            if isinstance(index["checkpoints"], list):
+                # Ancien format (liste) : migré en mémoire, réécrit au prochain compactage
+                index["checkpoints"] = {cp["id"]: cp for cp in index["checkpoints"]}
+
+        log_ops = 0
+        damaged = False
+        if key[1] is not None:
+            checkpoints = index["checkpoints"]
+            for line in self._index_log.read_bytes().splitlines():
+                try:
+                    op = _loads_index(line)
+                except ValueError:
+                    damaged = True  # Ligne tronquée (arrêt pendant une écriture)
+                    continue
+                self._apply_op(checkpoints, op)
+                log_ops += 1
+
+        self._index_cache = index
+        self._index_stat = key
+        self._log_ops = log_ops
+        self._log_damaged = damaged
+        return index
+
+    def _append_index(self, ops: list[dict]) -> None:
+        """Ajoute des opérations au journal (et à l'index en mémoire)."""
+        index = self._load_index()
+        try:
+            for op in ops:
+                self._apply_op(index["checkpoints"], op)
+            if self._log_damaged:
+                # Ajouter derrière une ligne tronquée la corromprait aussi
+                self._write_snapshot(index)
+                return
+            with open(self._index_log, "ab") as log:
+                log.write(b"".join(_dumps_line(op) for op in ops))
+            self._log_ops += len(ops)
+
+            if self._log_ops > max(2 * len(index["checkpoints"]), self.COMPACT_MIN_OPS):
+                self._write_snapshot(index)
+            else:
+                self._index_stat = self._stat_key()
+        except Exception:
+            # État disque inconnu : relire au prochain chargement
+            self._index_cache = self._index_stat = None
+            raise
+
+    def _write_snapshot(self, index: dict) -> None:
+        """Réécrit l'instantané complet (atomique) et vide le journal."""
+        tmp = self._index_file.with_name(self._index_file.name + ".tmp")
+        # Les timestamps sont déjà des chaînes ISO : pas besoin de default=str
+        tmp.write_bytes(_dumps_index(index))
+        os.replace(tmp, self._index_file)
+        # Un arrêt ici laisse un journal déjà inclus : le rejouer est sans effet
+        self._index_log.unlink(missing_ok=True)
+        self._log_ops = 0
+        self._log_damaged = False
+        self._index_cache = index
+        self._index_stat = self._stat_key()
+
+    def list_checkpoints(self) -> list[CheckpointData]:
+        """Liste les checkpoints depuis l'index."""
+        index = self._load_index()
+        checkpoints = []
+
+        for cp in index["checkpoints"].values():
+            checkpoints.append(CheckpointData(
+                id=cp["id"],
+                name=cp["name"],
+                timestamp=datetime.fromisoformat(cp["timestamp"]),
+                files=cp.get("files", []),
+                is_auto=cp.get("is_auto", False),
+                description=cp.get("description", ""),
+            ))
+
+        return sorted(checkpoints, key=lambda x: x.timestamp, reverse=True)
+
+
+class GitStashStorage(IndexedStorage):
     """
     Storage utilisant git stash.
 
@@ -61,27 +258,31 @@ class GitStashStorage(StorageBase):
     - Efficace (diff-based)
     - Intégré avec git
     - Supporte les fichiers non trackés
+
+    Avec pygit2, les opérations de stash passent par libgit2 dans le
+    processus ; sans lui (ou s'il échoue à ouvrir le dépôt), par `git`.
     """
 
     def __init__(self, working_dir: Path):
+        super().__init__()
         self.working_dir = working_dir
         self._index_file = working_dir / ".git" / "therese_checkpoints.json"
+        self._repo = None  # pygit2.Repository, ouvert à la demande (False si indisponible)
+
+    def _git_repo(self):
+        """Dépôt pygit2 (ouvert une seule fois), ou None pour passer par `git`."""
+        if self._repo is None:
+            try:
+                self._repo = pygit2.Repository(str(self.working_dir)) if pygit2 else False
+            except Exception:
+                self._repo = False
+        return self._repo or None
 
     def is_available(self) -> bool:
         """Vérifie si le repo git est disponible."""
         git_dir = self.working_dir / ".git"
         return git_dir.exists() and git_dir.is_dir()
 
-    def _load_index(self) -> dict:
-        """Charge l'index des checkpoints."""
-        if self._index_file.exists():
-            return json.loads(self._index_file.read_text())
-        return {"checkpoints": []}
-
-    def _save_index(self, index: dict) -> None:
-        """Sauvegarde l'index."""
-        self._index_file.write_text(json.dumps(index, indent=2, default=str))
-
     def _run_git(self, *args) -> tuple[bool, str]:
         """Exécute une commande git."""
         try:
@@ -101,14 +302,22 @@ class GitStashStorage(StorageBase):
         stash_msg = f"THERESE_CP:{checkpoint.id}:{checkpoint.name}"
 
         # Stash incluant les fichiers non trackés
-        success, output = self._run_git("stash", "push", "-u", "-m", stash_msg)
+        success = False
+        repo = self._git_repo()
+        if repo is not None:
+            try:
+                repo.stash(repo.default_signature, stash_msg, include_untracked=True)
+                success = True
+            except Exception:
+                pass  # Rien à stash, identité git absente... : repli sur `git`
+        if not success:
+            success, output = self._run_git("stash", "push", "-u", "-m", stash_msg)
         if not success:
             # Rien à stash (pas de changements)
             return False
 
         # Enregistrer dans l'index
-        index = self._load_index()
-        index["checkpoints"].append({
+        self._append_index([{"op": "add", "cp": {
             "id": checkpoint.id,
             "name": checkpoint.name,
             "timestamp": checkpoint.timestamp.isoformat(),
@@ -116,8 +325,7 @@ class GitStashStorage(StorageBase):
             "is_auto": checkpoint.is_auto,
             "description": checkpoint.description,
             "stash_ref": f"stash@{{0}}",  # Le dernier stash
-        })
-        self._save_index(index)
+        }}])
 
         return True
 
@@ -126,23 +334,38 @@ class GitStashStorage(StorageBase):
         index = self._load_index()
 
         # Trouver le checkpoint
-        cp_data = None
-        for cp in index["checkpoints"]:
-            if cp["id"] == checkpoint_id:
-                cp_data = cp
-                break
-
+        cp_data = index["checkpoints"].get(checkpoint_id)
         if not cp_data:
             return False
 
         # Trouver le stash correspondant
+        marker = f"THERESE_CP:{checkpoint_id}:"
+        repo = self._git_repo()
+        if repo is not None:
+            for stash_index, stash in enumerate(repo.listall_stashes()):
+                if marker in stash.message:
+                    break
+            else:
+                return False
+            # Restaurer le stash
+            try:
+                repo.stash_pop(stash_index)
+                return True
+            except Exception:
+                return False  # Conflit : pas de nouvelle tentative sur un état incertain
+
+        # Aucun stash du tout : inutile de lister et parser `git stash list`
+        has_stash, _ = self._run_git("rev-parse", "--verify", "--quiet", "refs/stash")
+        if not has_stash:
+            return False
+
         success, stash_list = self._run_git("stash", "list")
         if not success:
             return False
 
         stash_ref = None
         for line in stash_list.strip().split("\n"):
-            if f"THERESE_CP:{checkpoint_id}:" in line:
+            if marker in line:
                 # Extraire la ref (ex: stash@{0})
                 stash_ref = line.split(":")[0]
                 break
@@ -154,35 +377,24 @@ class GitStashStorage(StorageBase):
         success, _ = self._run_git("stash", "pop", stash_ref)
         return success
 
-    def list_checkpoints(self) -> list[CheckpointData]:
-        """Liste les checkpoints depuis l'index."""
-        index = self._load_index()
-        checkpoints = []
-
-        for cp in index["checkpoints"]:
-            checkpoints.append(CheckpointData(
-                id=cp["id"],
-                name=cp["name"],
-                timestamp=datetime.fromisoformat(cp["timestamp"]),
-                files=cp.get("files", []),
-                is_auto=cp.get("is_auto", False),
-                description=cp.get("description", ""),
-            ))
-
-        return sorted(checkpoints, key=lambda x: x.timestamp, reverse=True)
-
     def delete(self, checkpoint_id: str) -> bool:
         """Supprime un checkpoint."""
-        index = self._load_index()
-        index["checkpoints"] = [
-            cp for cp in index["checkpoints"]
-            if cp["id"] != checkpoint_id
+        return self.delete_many([checkpoint_id]) == 1
+
+    def delete_many(self, checkpoint_ids: list[str]) -> int:
+        """Supprime plusieurs checkpoints de l'index (une seule écriture au journal)."""
+        checkpoints = self._load_index()["checkpoints"]
+        ops = [
+            {"op": "del", "id": cp_id}
+            for cp_id in dict.fromkeys(checkpoint_ids)
+            if cp_id in checkpoints
         ]
-        self._save_index(index)
-        return True
+        if ops:
+            self._append_index(ops)
+        return len(ops)
 
 
-class FileStorage(StorageBase):
+class FileStorage(IndexedStorage):
     """
     Storage utilisant des archives tar.gz.
 
@@ -190,67 +402,140 @@ class FileStorage(StorageBase):
     """
 
     def __init__(self, working_dir: Path, storage_dir: Path | None = None):
+        super().__init__()
         self.working_dir = working_dir
-        self.storage_dir = storage_dir or (
-            Path.home() / ".therese" / "checkpoints" / self._project_hash()
-        )
+        self.storage_dir = storage_dir or self._default_storage_dir()
         self.storage_dir.mkdir(parents=True, exist_ok=True)
         self._index_file = self.storage_dir / "index.json"
 
-    def _project_hash(self) -> str:
-        """Hash du chemin du projet pour nommage unique."""
-        return hashlib.md5(str(self.working_dir).encode()).hexdigest()[:12]
+    def _default_storage_dir(self) -> Path:
+        """Dossier ~/.therese/checkpoints/<hash du projet>."""
+        base = Path.home() / ".therese" / "checkpoints"
+        storage_dir = base / self._project_hash()
+        if not storage_dir.exists():
+            # Dossier nommé par l'ancien hash (MD5) : le réutiliser, l'index
+            # y référence les archives par chemin absolu
+            legacy_dir = base / self._legacy_project_hash()
+            if legacy_dir.exists():
+                return legacy_dir
+        return storage_dir
 
-    def _load_index(self) -> dict:
-        """Charge l'index des checkpoints."""
-        if self._index_file.exists():
-            return json.loads(self._index_file.read_text())
-        return {"checkpoints": []}
+    def _project_hash(self) -> str:
+        """Hash du chemin du projet pour nommage unique (pas un usage cryptographique)."""
+        return hashlib.blake2b(str(self.working_dir).encode(), digest_size=6).hexdigest()
 
-    def _save_index(self, index: dict) -> None:
-        """Sauvegarde l'index."""
-        self._index_file.write_text(json.dumps(index, indent=2, default=str))
+    def _legacy_project_hash(self) -> str:
+        """Ancien nommage (MD5), pour retrouver les checkpoints existants."""
+        return hashlib.md5(str(self.working_dir).encode()).hexdigest()[:12]
 
     def save(self, checkpoint: CheckpointData, files: list[Path]) -> bool:
-        """Sauvegarde les fichiers dans une archive tar.gz."""
-        archive_path = self.storage_dir / f"{checkpoint.id}.tar.gz"
+        """Sauvegarde les fichiers dans une archive tar.zst (ou tar.gz)."""
+        archive_format = "zst" if zstandard is not None else "gz"
+        archive_path = self.storage_dir / f"{checkpoint.id}.tar.{archive_format}"
 
         try:
-            with tarfile.open(archive_path, "w:gz") as tar:
-                for file_path in files:
-                    if file_path.exists():
-                        # Chemin relatif au working_dir
-                        arcname = file_path.relative_to(self.working_dir)
-                        tar.add(file_path, arcname=str(arcname))
+            # Chemins relatifs au working_dir
+            arcnames = [str(f.relative_to(self.working_dir)) for f in files if f.exists()]
+            if archive_format == "zst":
+                self._write_archive_zstd(archive_path, arcnames)
+            elif not self._write_archive_pigz(archive_path, arcnames):
+                self._write_archive(archive_path, arcnames)
 
             # Mettre à jour l'index
-            index = self._load_index()
-            index["checkpoints"].append({
+            self._append_index([{"op": "add", "cp": {
                 "id": checkpoint.id,
                 "name": checkpoint.name,
                 "timestamp": checkpoint.timestamp.isoformat(),
-                "files": [str(f.relative_to(self.working_dir)) for f in files if f.exists()],
+                "files": arcnames,
                 "is_auto": checkpoint.is_auto,
                 "description": checkpoint.description,
                 "archive": str(archive_path),
-            })
-            self._save_index(index)
+                "format": archive_format,
+            }}])
 
             return True
         except Exception:
             return False
 
+    def _write_archive(self, archive_path: Path, arcnames: list[str]) -> None:
+        """Crée l'archive en Python (tarfile, compression sur un seul cœur)."""
+        # Mode flux ("w|gz") : écriture séquentielle par blocs de 2 Mio
+        with tarfile.open(
+            str(archive_path), "w|gz", bufsize=ARCHIVE_BUFSIZE, copybufsize=ARCHIVE_BUFSIZE
+        ) as tar:
+            for arcname in arcnames:
+                tar.add(self.working_dir / arcname, arcname=arcname)
+
+    def _write_archive_zstd(self, archive_path: Path, arcnames: list[str]) -> None:
+        """Crée l'archive tar.zst (zstd multi-thread : bien plus rapide que gzip)."""
+        compressor = zstandard.ZstdCompressor(level=3, threads=-1)
+        with open(archive_path, "wb") as raw, compressor.stream_writer(raw) as comp:
+            with tarfile.open(
+                fileobj=comp, mode="w|", bufsize=ARCHIVE_BUFSIZE, copybufsize=ARCHIVE_BUFSIZE
+            ) as tar:
+                for arcname in arcnames:
+                    tar.add(self.working_dir / arcname, arcname=arcname)
+
+    def _write_archive_pigz(self, archive_path: Path, arcnames: list[str]) -> bool:
+        """
+        Crée l'archive avec `tar | pigz` (compression gzip sur tous les cœurs).
+
+        Le résultat reste un tar.gz standard, relu par tarfile à la restauration.
+
+        Returns:
+            False si tar/pigz sont absents ou ont échoué (repli sur tarfile)
+        """
+        tools = _pigz_pipeline()
+        if tools is None:
+            return False
+        tar_bin, pigz_bin = tools
+
+        procs: list[subprocess.Popen] = []
+        ok = False
+        try:
+            with open(archive_path, "wb") as out:
+                tar = subprocess.Popen(
+                    [tar_bin, "-cf", "-", "-C", str(self.working_dir), "--null", "-T", "-"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+                procs.append(tar)
+                pigz = subprocess.Popen(
+                    [pigz_bin, "-p", str(os.cpu_count() or 1), "-c"],
+                    stdin=tar.stdout,
+                    stdout=out,
+                    stderr=subprocess.DEVNULL,
+                )
+                procs.append(pigz)
+                tar.stdout.close()  # pigz est le seul lecteur du pipe
+                # Chemins séparés par NUL (noms avec espaces ou retours à la ligne)
+                tar.stdin.write(b"".join(os.fsencode(name) + b"\0" for name in arcnames))
+                tar.stdin.close()
+                ok = tar.wait() == 0 and pigz.wait() == 0
+        except OSError:  # BrokenPipeError compris
+            ok = False
+        finally:
+            # Échec ou interruption : pas de processus zombie ni d'archive partielle
+            if not ok:
+                for proc in procs:
+                    if proc.returncode is None:
+                        proc.kill()
+                    proc.wait()
+                    if proc.stdin and not proc.stdin.closed:
+                        try:
+                            proc.stdin.close()
+                        except OSError:
+                            pass  # Données en attente sur un pipe déjà rompu
+                archive_path.unlink(missing_ok=True)
+        return ok
+
     def restore(self, checkpoint_id: str) -> bool:
         """Restaure les fichiers depuis l'archive."""
         index = self._load_index()
 
         # Trouver le checkpoint
-        cp_data = None
-        for cp in index["checkpoints"]:
-            if cp["id"] == checkpoint_id:
-                cp_data = cp
-                break
-
+        cp_data = index["checkpoints"].get(checkpoint_id)
         if not cp_data:
             return False
 
@@ -259,45 +544,48 @@ class FileStorage(StorageBase):
             return False
 
         try:
-            with tarfile.open(archive_path, "r:gz") as tar:
-                tar.extractall(self.working_dir)
+            # Anciennes entrées sans "format" : archives tar.gz
+            if cp_data.get("format", "gz") == "zst":
+                if zstandard is None:
+                    return False  # Archive créée avec zstandard, absent ici
+                with open(archive_path, "rb") as raw, \
+                        zstandard.ZstdDecompressor().stream_reader(raw) as reader:
+                    with tarfile.open(
+                        fileobj=reader,
+                        mode="r|",
+                        bufsize=ARCHIVE_BUFSIZE,
+                        copybufsize=ARCHIVE_BUFSIZE,
+                    ) as tar:
+                        tar.extractall(self.working_dir)
+            else:
+                with tarfile.open(
+                    str(archive_path), "r|gz", bufsize=ARCHIVE_BUFSIZE, copybufsize=ARCHIVE_BUFSIZE
+                ) as tar:
+                    tar.extractall(self.working_dir)
             return True
         except Exception:
             return False
 
-    def list_checkpoints(self) -> list[CheckpointData]:
-        """Liste les checkpoints depuis l'index."""
-        index = self._load_index()
-        checkpoints = []
-
-        for cp in index["checkpoints"]:
-            checkpoints.append(CheckpointData(
-                id=cp["id"],
-                name=cp["name"],
-                timestamp=datetime.fromisoformat(cp["timestamp"]),
-                files=cp.get("files", []),
-                is_auto=cp.get("is_auto", False),
-                description=cp.get("description", ""),
-            ))
-
-        return sorted(checkpoints, key=lambda x: x.timestamp, reverse=True)
-
     def delete(self, checkpoint_id: str) -> bool:
         """Supprime un checkpoint et son archive."""
-        index = self._load_index()
-
-        # Trouver et supprimer l'archive
-        for cp in index["checkpoints"]:
-            if cp["id"] == checkpoint_id:
-                archive_path = Path(cp.get("archive", ""))
-                if archive_path.exists():
-                    archive_path.unlink()
-                break
+        return self.delete_many([checkpoint_id]) == 1
+
+    def delete_many(self, checkpoint_ids: list[str]) -> int:
+        """Supprime plusieurs checkpoints et leurs archives (une seule écriture au journal)."""
+        checkpoints = self._load_index()["checkpoints"]
+        ops = []
+
+        for cp_id in dict.fromkeys(checkpoint_ids):
+            cp = checkpoints.get(cp_id)
+            if cp is None:
+                continue
+            ops.append({"op": "del", "id": cp_id})
+            # Supprimer l'archive
+            archive = cp.get("archive")
+            if archive:
+                Path(archive).unlink(missing_ok=True)
 
         # Mettre à jour l'index
-        index["checkpoints"] = [
-            cp for cp in index["checkpoints"]
-            if cp["id"] != checkpoint_id
-        ]
-        self._save_index(index)
-        return True
+        if ops:
+            self._append_index(ops)
+        return len(ops)
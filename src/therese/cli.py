@@ -151,7 +151,7 @@ Sois concis et direct."""
             return 1
 
     # Créer l'agent et exécuter
-    agent = ThereseAgent()
+    agent = ThereseAgent(config=config)
 
     # Appliquer la config de l'agent personnalisé
     if agent_config:
@@ -162,8 +162,7 @@ Sois concis et direct."""
         # Prepend le system prompt de l'agent
         if agent_config.system_prompt:
             # Injecter le system prompt de l'agent avant le premier message
-            original_system = agent.messages[0].content if agent.messages else ""
-            agent.messages[0].content = f"{agent_config.system_prompt}\n\n---\n\n{original_system}"
+            agent.prepend_system_prompt(agent_config.system_prompt)
 
     try:
         # Streaming sur stderr (stdout réservé pour output parsable)
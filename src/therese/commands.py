@@ -244,6 +244,10 @@ class CommandRegistry:
         # Mettre à jour la mémoire
         memory.update_from_detection(info.to_dict())
 
+        # Le prompt système doit refléter le nouveau contexte projet
+        from .agent import invalidate_project_cache
+        invalidate_project_cache()
+
         lines = [
             "# 🎉 Projet initialisé !",
             "",
@@ -281,16 +285,20 @@ class CommandRegistry:
 
     async def _cmd_memory(self, args: str = "") -> str:
         """Gère la mémoire."""
+        from .agent import invalidate_project_cache
+
         memory = get_memory_manager()
 
         if args == "clear":
             memory._memory = None
             if memory.memory_file.exists():
                 memory.memory_file.unlink()
+            invalidate_project_cache()
             return "✅ Mémoire effacée"
 
         if args.startswith("add "):
             item = args[4:].strip()
+            invalidate_project_cache()
             if item.startswith("pattern:"):
                 memory.add_pattern(item[8:].strip())
                 return f"✅ Pattern ajouté: {item[8:].strip()}"
@@ -603,7 +611,7 @@ class CommandRegistry:
             return "Usage: `/kill <task_id>`"
 
         manager = get_background_manager()
-        success, message = manager.kill(args.strip())
+        success, message = await manager.kill(args.strip())
         return message
 
     async def _cmd_output(self, args: str = "") -> str:
@@ -49,11 +49,24 @@ class ThereseConfig:
     auto_compact: bool = True  # Active le compactage automatique
     compact_threshold: float = 0.75  # Compacte à 75% du max_context_tokens
     compact_keep_recent: int = 10  # Garder les N derniers messages
+    max_messages: int = 400  # Plafond dur de l'historique (0 = illimité)
+
+    # Gros résultats d'outils déjà transmis : remplacés par une empreinte
+    # après N requêtes (0 = jamais). Le contenu complet reste dans l'historique.
+    elide_tool_results_after: int = 2
+    elide_tool_results_min_chars: int = 2000
 
     # Mode
     mode: Literal["auto", "safe", "yolo"] = "auto"
     ultrathink: bool = False  # Mode raisonnement étendu
 
+    # Outils
+    max_parallel_tools: int = 5  # Outils en lecture seule exécutés en parallèle
+
+    # Streaming : regroupe les deltas avant de les transmettre à l'UI / au SSE
+    stream_flush_chunks: int = 4  # Nombre de deltas max par envoi
+    stream_flush_ms: float = 15.0  # Délai max avant envoi
+
     # Répertoire de travail (sandbox par défaut pour la sécurité)
     working_dir: Path = field(default_factory=_get_default_working_dir)
 
@@ -16,6 +16,15 @@ from pydantic import BaseModel, Field
 
 from ..config import config as therese_config
 
+try:
+    import orjson
+
+    def _json_dumps(obj: object) -> str:
+        """Sérialise en JSON (orjson : un événement SSE par chunk streamé)."""
+        return orjson.dumps(obj).decode()
+except ImportError:  # orjson est optionnel (extra "fast")
+    _json_dumps = json.dumps
+
 
 # === MODÈLES PYDANTIC ===
 
@@ -100,11 +109,13 @@ class ThereseHTTPServer:
         """Lazy loading de l'agent."""
         if self._agent is None:
             from ..agent import ThereseAgent
-            self._agent = ThereseAgent()
+            self._agent = ThereseAgent(config=therese_config)
         return self._agent
 
     def reset_agent(self):
         """Réinitialise l'agent."""
+        if self._agent is not None:
+            self._agent.close()
         self._agent = None
 
     async def stream_chat(self, request: ChatRequest) -> AsyncIterator[str]:
@@ -142,7 +153,7 @@ class ThereseHTTPServer:
                 "finish_reason": None,
             }],
         }
-        yield f"data: {json.dumps(first_chunk)}\n\n"
+        yield f"data: {_json_dumps(first_chunk)}\n\n"
 
         # Streamer la réponse
         try:
@@ -158,7 +169,7 @@ class ThereseHTTPServer:
                         "finish_reason": None,
                     }],
                 }
-                yield f"data: {json.dumps(data)}\n\n"
+                yield f"data: {_json_dumps(data)}\n\n"
 
         except Exception as e:
             error_chunk = {
@@ -172,7 +183,7 @@ class ThereseHTTPServer:
                     "finish_reason": "error",
                 }],
             }
-            yield f"data: {json.dumps(error_chunk)}\n\n"
+            yield f"data: {_json_dumps(error_chunk)}\n\n"
 
         # Envoyer le chunk final
         final_chunk = {
@@ -186,7 +197,7 @@ class ThereseHTTPServer:
                 "finish_reason": "stop",
             }],
         }
-        yield f"data: {json.dumps(final_chunk)}\n\n"
+        yield f"data: {_json_dumps(final_chunk)}\n\n"
         yield "data: [DONE]\n\n"
 
     def chat_sync(self, request: ChatRequest) -> ChatResponse:
@@ -16,6 +16,13 @@ from rich.console import Console
 
 from .config import MCPConfig, MCPServerConfig
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson est optionnel (extra "fast")
+    _json_loads = json.loads
+
 console = Console(stderr=True)
 
 
@@ -158,7 +165,7 @@ class MCPServerConnection:
             )
 
             if response_line:
-                return json.loads(response_line.decode())
+                return _json_loads(response_line)
             return None
 
         except asyncio.TimeoutError:
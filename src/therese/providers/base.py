@@ -11,7 +11,7 @@ from dataclasses import dataclass
 from typing import Iterator, Any
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamChunk:
     """Un chunk de streaming."""
     content: str | None = None
@@ -34,6 +34,7 @@ class ProviderBase(ABC):
         messages: list[dict],
         model: str,
         tools: list[dict] | None = None,
+        max_tokens: int | None = None,
     ) -> Iterator[StreamChunk]:
         """
         Streaming synchrone de la réponse.
@@ -42,6 +43,7 @@ class ProviderBase(ABC):
             messages: Liste de messages au format {"role": str, "content": str}
             model: Nom du modèle à utiliser
             tools: Schémas des outils (function calling)
+            max_tokens: Plafond de tokens générés (None = limite du modèle)
 
         Yields:
             StreamChunk avec content et/ou tool_calls
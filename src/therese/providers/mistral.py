@@ -5,7 +5,8 @@ Provider pour l'API cloud Mistral AI.
 Supporte : tools, vision (Pixtral), thinking (Magistral).
 """
 
-from typing import Iterator
+from typing import Any, Iterator
+import functools
 import os
 
 from mistralai import Mistral
@@ -22,6 +23,17 @@ from mistralai.models import (
 from .base import ProviderBase, StreamChunk
 
 
+@functools.lru_cache(maxsize=4)
+def _get_client(api_key: str) -> Mistral:
+    """
+    Client Mistral partagé pour le process, par clé API.
+
+    Le client HTTP sous-jacent (httpx) est thread-safe : le partager évite
+    de refaire la poignée de main TLS à chaque requête.
+    """
+    return Mistral(api_key=api_key)
+
+
 class MistralProvider(ProviderBase):
     """Provider pour l'API Mistral AI."""
 
@@ -56,49 +68,74 @@ class MistralProvider(ProviderBase):
         self.api_key = api_key or os.getenv("MISTRAL_API_KEY", "")
         if not self.api_key:
             raise ValueError("MISTRAL_API_KEY non définie")
+        # id(dict source) -> (dict source, message Mistral converti)
+        self._converted: dict[int, tuple[dict, Any]] = {}
 
     def _create_client(self) -> Mistral:
-        """Crée un nouveau client (pour thread safety)."""
-        return Mistral(api_key=self.api_key)
+        """Retourne le client partagé (pool de connexions réutilisé)."""
+        return _get_client(self.api_key)
+
+    def _convert_message(self, msg: dict):
+        """Convertit un message au format Mistral (None si rôle inconnu)."""
+        role = msg.get("role", "user")
+        content = msg.get("content", "")
+        images = msg.get("images", [])
+        tool_calls = msg.get("tool_calls")
+        tool_call_id = msg.get("tool_call_id")
+        name = msg.get("name")
+
+        if role == "system":
+            return SystemMessage(content=content)
+        elif role == "user":
+            if images:
+                # Multi-modal
+                chunks = []
+                if content:
+                    chunks.append(TextChunk(text=content))
+                for img in images:
+                    if isinstance(img, dict):
+                        url = img.get("url") or (
+                            f"data:{img.get('mime_type', 'image/png')};base64,{img.get('base64', '')}"
+                        )
+                        chunks.append(ImageURLChunk(image_url=url))
+                    else:
+                        chunks.append(ImageURLChunk(image_url=img))
+                return UserMessage(content=chunks)
+            return UserMessage(content=content)
+        elif role == "assistant":
+            if tool_calls:
+                return AssistantMessage(content=content or "", tool_calls=tool_calls)
+            return AssistantMessage(content=content)
+        elif role == "tool":
+            return ToolMessage(
+                content=content,
+                tool_call_id=tool_call_id,
+                name=name,
+            )
+        return None
 
     def _convert_messages(self, messages: list[dict]) -> list:
-        """Convertit les messages au format Mistral."""
+        """
+        Convertit les messages au format Mistral.
+
+        Les objets déjà convertis sont réutilisés tant que le dict source est
+        le même objet (l'agent garde ses messages provider d'un appel à
+        l'autre) : seuls les nouveaux messages sont convertis à chaque itération.
+        """
+        previous = self._converted
+        converted: dict[int, tuple[dict, Any]] = {}
         result = []
         for msg in messages:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            images = msg.get("images", [])
-            tool_calls = msg.get("tool_calls")
-            tool_call_id = msg.get("tool_call_id")
-            name = msg.get("name")
-
-            if role == "system":
-                result.append(SystemMessage(content=content))
-            elif role == "user":
-                if images:
-                    # Multi-modal
-                    chunks = []
-                    if content:
-                        chunks.append(TextChunk(text=content))
-                    for img in images:
-                        if isinstance(img, dict):
-                            chunks.append(ImageURLChunk(image_url=img.get("url", "")))
-                        else:
-                            chunks.append(ImageURLChunk(image_url=img))
-                    result.append(UserMessage(content=chunks))
-                else:
-                    result.append(UserMessage(content=content))
-            elif role == "assistant":
-                if tool_calls:
-                    result.append(AssistantMessage(content=content or "", tool_calls=tool_calls))
-                else:
-                    result.append(AssistantMessage(content=content))
-            elif role == "tool":
-                result.append(ToolMessage(
-                    content=content,
-                    tool_call_id=tool_call_id,
-                    name=name,
-                ))
+            entry = previous.get(id(msg))
+            if entry is not None and entry[0] is msg:
+                mistral_msg = entry[1]
+            else:
+                mistral_msg = self._convert_message(msg)
+            # On garde une référence au dict : son id() ne peut pas être réutilisé
+            converted[id(msg)] = (msg, mistral_msg)
+            if mistral_msg is not None:
+                result.append(mistral_msg)
+        self._converted = converted
         return result
 
     def chat_stream(
@@ -106,6 +143,7 @@ class MistralProvider(ProviderBase):
         messages: list[dict],
         model: str,
         tools: list[dict] | None = None,
+        max_tokens: int | None = None,
     ) -> Iterator[StreamChunk]:
         """Streaming synchrone via l'API Mistral."""
         client = self._create_client()
@@ -119,26 +157,45 @@ class MistralProvider(ProviderBase):
         if tools:
             kwargs["tools"] = tools
             kwargs["tool_choice"] = "auto"
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
 
         response = client.chat.stream(**kwargs)
 
-        # Accumulateurs pour tool_calls
-        current_tool_calls: list[dict] = []
+        # Accumulateurs pour tool_calls (indexés par tc.index).
+        # Les arguments arrivent en petits fragments : on les bufferise en liste
+        # et on ne les joint qu'une fois (évite les += quadratiques sur str).
+        current_tool_calls: dict[int, dict] = {}
+        arguments_parts: dict[int, list[str]] = {}
 
         for event in response:
-            if not event.data.choices:
+            data = event.data
+
+            # Usage d'abord : certains events (fin de stream) n'ont que ça
+            usage = None
+            if data.usage:
+                usage = {
+                    "prompt_tokens": data.usage.prompt_tokens or 0,
+                    "completion_tokens": data.usage.completion_tokens or 0,
+                }
+
+            choices = data.choices
+            if not choices:
+                if usage:
+                    yield StreamChunk(usage=usage)
                 continue
 
-            choice = event.data.choices[0]
+            choice = choices[0]
             delta = choice.delta
 
-            chunk = StreamChunk()
+            chunk = StreamChunk(usage=usage)
 
             # Contenu textuel
-            if delta.content:
-                if isinstance(delta.content, list):
+            content = delta.content
+            if content:
+                if isinstance(content, list):
                     text_parts = []
-                    for item in delta.content:
+                    for item in content:
                         if isinstance(item, ThinkChunk):
                             # Thinking visible (Magistral)
                             for think_text in item.thinking or []:
@@ -149,40 +206,39 @@ class MistralProvider(ProviderBase):
                     if text_parts:
                         chunk.content = "".join(text_parts)
                 else:
-                    chunk.content = delta.content
+                    chunk.content = content
 
             # Tool calls
-            if delta.tool_calls:
-                for tc in delta.tool_calls:
-                    if tc.index >= len(current_tool_calls):
-                        current_tool_calls.append({
+            tool_call_deltas = delta.tool_calls
+            if tool_call_deltas:
+                for tc in tool_call_deltas:
+                    call = current_tool_calls.get(tc.index)
+                    if call is None:
+                        current_tool_calls[tc.index] = {
                             "id": tc.id or "",
                             "type": "function",
                             "function": {
                                 "name": tc.function.name or "",
-                                "arguments": tc.function.arguments or "",
+                                "arguments": "",
                             },
-                        })
-                    else:
-                        if tc.function.arguments:
-                            current_tool_calls[tc.index]["function"]["arguments"] += tc.function.arguments
-                        if tc.function.name:
-                            current_tool_calls[tc.index]["function"]["name"] = tc.function.name
-                        if tc.id:
-                            current_tool_calls[tc.index]["id"] = tc.id
-
-            # Usage
-            if event.data.usage:
-                chunk.usage = {
-                    "prompt_tokens": event.data.usage.prompt_tokens or 0,
-                    "completion_tokens": event.data.usage.completion_tokens or 0,
-                }
+                        }
+                        arguments_parts[tc.index] = [tc.function.arguments or ""]
+                        continue
+
+                    if tc.function.arguments:
+                        arguments_parts[tc.index].append(tc.function.arguments)
+                    if tc.function.name:
+                        call["function"]["name"] = tc.function.name
+                    if tc.id:
+                        call["id"] = tc.id
 
             # Finish reason
             if choice.finish_reason:
                 chunk.finish_reason = choice.finish_reason
                 if current_tool_calls:
-                    chunk.tool_calls = current_tool_calls
+                    for i, call in current_tool_calls.items():
+                        call["function"]["arguments"] = "".join(arguments_parts[i])
+                    chunk.tool_calls = [current_tool_calls[i] for i in sorted(current_tool_calls)]
 
             if chunk.content or chunk.tool_calls or chunk.usage:
                 yield chunk
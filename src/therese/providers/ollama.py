@@ -12,6 +12,13 @@ import httpx
 
 from .base import ProviderBase, StreamChunk
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson est optionnel (extra "fast")
+    _json_loads = json.loads
+
 
 class OllamaProvider(ProviderBase):
     """Provider pour Ollama (modèles locaux)."""
@@ -104,11 +111,32 @@ class OllamaProvider(ProviderBase):
                 ollama_tools.append(tool)
         return ollama_tools
 
+    @staticmethod
+    def _normalize_tool_call(tool_call: dict, index: int) -> dict:
+        """
+        Normalise un tool call Ollama au format commun (type OpenAI/Mistral).
+
+        Ollama renvoie les arguments en objet JSON et pas toujours d'id.
+        """
+        function = tool_call.get("function", {})
+        arguments = function.get("arguments", {})
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments)
+        return {
+            "id": tool_call.get("id") or f"call_{index}",
+            "type": "function",
+            "function": {
+                "name": function.get("name", ""),
+                "arguments": arguments,
+            },
+        }
+
     def chat_stream(
         self,
         messages: list[dict],
         model: str,
         tools: list[dict] | None = None,
+        max_tokens: int | None = None,
     ) -> Iterator[StreamChunk]:
         """Streaming synchrone via l'API Ollama."""
         ollama_messages = self._convert_messages(messages)
@@ -125,6 +153,12 @@ class OllamaProvider(ProviderBase):
             if ollama_tools:
                 payload["tools"] = ollama_tools
 
+        if max_tokens:
+            payload["options"] = {"num_predict": max_tokens}
+
+        # Tool calls accumulés sur tout le stream (indexés), émis une seule fois à la fin
+        tool_calls: dict[int, dict] = {}
+
         try:
             with httpx.stream(
                 "POST",
@@ -139,7 +173,7 @@ class OllamaProvider(ProviderBase):
                         continue
 
                     try:
-                        data = json.loads(line)
+                        data = _json_loads(line)
                     except json.JSONDecodeError:
                         continue
 
@@ -152,11 +186,15 @@ class OllamaProvider(ProviderBase):
 
                     # Tool calls
                     if message.get("tool_calls"):
-                        chunk.tool_calls = message["tool_calls"]
+                        for tc in message["tool_calls"]:
+                            index = tc.get("function", {}).get("index", len(tool_calls))
+                            tool_calls[index] = self._normalize_tool_call(tc, index)
 
                     # Done + stats
                     if data.get("done"):
                         chunk.finish_reason = "stop"
+                        if tool_calls:
+                            chunk.tool_calls = [tool_calls[i] for i in sorted(tool_calls)]
                         # Ollama retourne les stats à la fin
                         if "prompt_eval_count" in data:
                             chunk.usage = {
@@ -227,7 +265,7 @@ class OllamaProvider(ProviderBase):
                 response.raise_for_status()
                 for line in response.iter_lines():
                     if line:
-                        data = json.loads(line)
+                        data = _json_loads(line)
                         status = data.get("status", "")
                         if "pulling" in status or "downloading" in status:
                             completed = data.get("completed", 0)
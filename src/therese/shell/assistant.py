@@ -76,7 +76,8 @@ class ShellAssistant:
         """Lazy loading de l'agent pour éviter import circulaire."""
         if self._agent is None:
             from ..agent import ThereseAgent
-            self._agent = ThereseAgent()
+            from ..config import config
+            self._agent = ThereseAgent(config=config)
         return self._agent
 
     def analyze_error(self, error: CommandError) -> Iterator[str]:
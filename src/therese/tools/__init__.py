@@ -15,6 +15,8 @@ Outils disponibles (18 total):
 - Tâches: task_list, task_add, task_update
 """
 
+import functools
+
 from .base import Tool, ToolResult
 
 # Imports des outils
@@ -39,6 +41,14 @@ TOOLS: dict[str, Tool] = {}
 def register_tool(tool: Tool) -> None:
     """Enregistre un outil dans le registre global."""
     TOOLS[tool.name] = tool
+    invalidate_tools_cache()
+
+
+def invalidate_tools_cache() -> None:
+    """Invalide les schémas et le résumé mis en cache (registre modifié)."""
+    get_tools_schema.cache_clear()
+    get_tools_schema_subset.cache_clear()
+    get_tools_summary.cache_clear()
 
 
 def get_all_tools() -> list[Tool]:
@@ -51,11 +61,29 @@ def get_tool(name: str) -> Tool | None:
     return TOOLS.get(name)
 
 
+@functools.cache
 def get_tools_schema() -> list[dict]:
-    """Retourne les schémas de tous les outils pour Mistral."""
+    """
+    Retourne les schémas de tous les outils pour Mistral.
+
+    Calculé une seule fois par registre : la liste retournée est partagée,
+    ne pas la modifier.
+    """
     return [tool.to_mistral_schema() for tool in TOOLS.values()]
 
 
+@functools.cache
+def get_tools_schema_subset(names: frozenset[str]) -> list[dict]:
+    """
+    Retourne les schémas des seuls outils nommés (ex: subset Ollama).
+
+    Filtré une seule fois par registre et par ensemble de noms : même
+    contrat de partage que get_tools_schema().
+    """
+    return [schema for schema in get_tools_schema() if schema["function"]["name"] in names]
+
+
+@functools.cache
 def get_tools_summary() -> str:
     """Retourne un résumé des outils pour le prompt système."""
     categories = {
@@ -133,5 +161,7 @@ __all__ = [
     "get_all_tools",
     "get_tool",
     "get_tools_schema",
+    "get_tools_schema_subset",
     "get_tools_summary",
+    "invalidate_tools_cache",
 ]
@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from typing import Any
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolResult:
     """Résultat de l'exécution d'un outil."""
 
@@ -26,6 +26,12 @@ class Tool(ABC):
     name: str
     description: str
     parameters: dict[str, Any]
+    # True si l'outil peut modifier l'état (fichiers, repo, tâches) : jamais exécuté
+    # en parallèle. Par défaut True : seuls les outils audités en lecture seule
+    # le passent à False
+    mutates_fs: bool = True
+    # True si le résultat ne dépend que des arguments (mis en cache par l'agent)
+    cacheable: bool = False
 
     @abstractmethod
     async def execute(self, **kwargs: Any) -> ToolResult:
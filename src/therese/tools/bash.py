@@ -11,6 +11,7 @@ class BashTool(Tool):
     """Exécute des commandes bash."""
 
     name = "bash"
+    mutates_fs = True
     description = (
         "Exécute une commande bash dans le terminal. "
         "Utilisez pour git, npm, python, et autres commandes système. "
@@ -44,6 +45,35 @@ class BashTool(Tool):
         ":(){:|:&};:",  # Fork bomb
     ]
 
+    # Octets conservés par flux : au-delà, la sortie est lue puis jetée
+    # (30000 caractères affichés, marge pour l'UTF-8 multi-octets)
+    MAX_OUTPUT_BYTES = 120_000
+
+    @staticmethod
+    async def _read_bounded(stream: asyncio.StreamReader, limit: int) -> tuple[bytes, bool]:
+        """
+        Lit un flux en ne gardant que les `limit` premiers octets.
+
+        Le reste est consommé (pour ne pas bloquer le processus sur un pipe
+        plein) mais pas stocké : une commande très bavarde ne fait pas
+        exploser la mémoire.
+
+        Returns:
+            (données conservées, True si tronqué)
+        """
+        buffer = bytearray()
+        truncated = False
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                break
+            remaining = limit - len(buffer)
+            if remaining > 0:
+                buffer += chunk[:remaining]
+            if len(chunk) > remaining:
+                truncated = True
+        return bytes(buffer), truncated
+
     async def execute(
         self,
         command: str,
@@ -79,8 +109,12 @@ class BashTool(Tool):
             )
 
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
+                (stdout, stdout_truncated), (stderr, stderr_truncated), _ = await asyncio.wait_for(
+                    asyncio.gather(
+                        self._read_bounded(process.stdout, self.MAX_OUTPUT_BYTES),
+                        self._read_bounded(process.stderr, self.MAX_OUTPUT_BYTES),
+                        process.wait(),
+                    ),
                     timeout=timeout,
                 )
             except asyncio.TimeoutError:
@@ -97,9 +131,9 @@ class BashTool(Tool):
 
             # Tronquer si trop long
             max_output = 30000
-            if len(stdout_str) > max_output:
+            if stdout_truncated or len(stdout_str) > max_output:
                 stdout_str = stdout_str[:max_output] + "\n... [sortie tronquée]"
-            if len(stderr_str) > max_output:
+            if stderr_truncated or len(stderr_str) > max_output:
                 stderr_str = stderr_str[:max_output] + "\n... [erreur tronquée]"
 
             output = ""
@@ -10,6 +10,7 @@ class EditTool(Tool):
     """Édite un fichier en remplaçant une chaîne par une autre."""
 
     name = "edit_file"
+    mutates_fs = True
     description = (
         "Édite un fichier en remplaçant old_string par new_string. "
         "La chaîne old_string doit être unique dans le fichier (sinon utilisez replace_all=true)."
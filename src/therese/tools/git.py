@@ -12,6 +12,7 @@ class GitTool(Tool):
     """Exécute des commandes Git."""
 
     name = "git"
+    mutates_fs = True
     description = (
         "Exécute des commandes Git (status, diff, log, add, commit, branch, etc.). "
         "Sécurisé : bloque les commandes destructrices sans confirmation."
@@ -130,6 +131,7 @@ class GitCommitTool(Tool):
     """Crée un commit Git structuré."""
 
     name = "git_commit"
+    mutates_fs = True
     description = (
         "Crée un commit Git avec un message structuré. "
         "Analyse les changements et génère un message conventionnel."
@@ -241,6 +243,8 @@ class GitStatusTool(Tool):
     """Affiche le statut Git de manière lisible."""
 
     name = "git_status"
+    mutates_fs = False
+    cacheable = True
     description = (
         "Affiche le statut Git du dépôt de manière claire et structurée. "
         "Montre les fichiers modifiés, ajoutés, supprimés et non suivis."
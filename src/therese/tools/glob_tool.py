@@ -11,6 +11,8 @@ class GlobTool(Tool):
     """Recherche de fichiers par pattern glob."""
 
     name = "glob"
+    mutates_fs = False
+    cacheable = True
     description = (
         "Recherche des fichiers correspondant à un pattern glob (ex: '**/*.py', 'src/**/*.ts'). "
         "Retourne les chemins des fichiers trouvés, triés par date de modification."
@@ -12,6 +12,8 @@ class GrepTool(Tool):
     """Recherche de texte dans les fichiers."""
 
     name = "grep"
+    mutates_fs = False
+    cacheable = True
     description = (
         "Recherche un pattern (regex) dans le contenu des fichiers. "
         "Similaire à 'grep -r' ou 'rg'. Retourne les lignes correspondantes avec contexte."
@@ -168,6 +168,8 @@ class ProjectDetectTool(Tool):
     """Détecte le type de projet."""
 
     name = "project_detect"
+    mutates_fs = False
+    cacheable = True
     description = (
         "Détecte le type de projet, le langage, le package manager et les frameworks utilisés. "
         "Analyse pyproject.toml, package.json, Cargo.toml, etc."
@@ -231,6 +233,7 @@ class ProjectRunTool(Tool):
     """Exécute un script du projet."""
 
     name = "project_run"
+    mutates_fs = True
     description = (
         "Exécute un script défini dans le projet (npm run, bun run, cargo run, etc.). "
         "Détecte automatiquement le package manager."
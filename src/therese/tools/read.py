@@ -10,6 +10,8 @@ class ReadTool(Tool):
     """Lit le contenu d'un fichier."""
 
     name = "read_file"
+    mutates_fs = False
+    cacheable = True
     description = (
         "Lit le contenu d'un fichier. Retourne le contenu avec les numéros de ligne. "
         "Supporte offset et limit pour les gros fichiers."
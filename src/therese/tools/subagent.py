@@ -12,6 +12,13 @@ from .base import Tool, ToolResult
 from ..agents.loader import load_agent, get_loader
 from ..config import config
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson est optionnel (extra "fast")
+    _json_loads = json.loads
+
 
 class SubAgentTool(Tool):
     """
@@ -24,6 +31,7 @@ class SubAgentTool(Tool):
     """
 
     name = "spawn_subagent"
+    mutates_fs = True
     description = """Délègue une tâche à un agent spécialisé. Utilise cet outil quand:
 - Tu as besoin d'une revue de code approfondie (agent: code-reviewer)
 - Tu dois analyser et corriger un bug complexe (agent: debugger)
@@ -148,7 +156,7 @@ L'agent retournera son analyse/résultat."""
                 for tc in tool_calls:
                     func_name = tc["function"]["name"]
                     try:
-                        func_args = json.loads(tc["function"]["arguments"])
+                        func_args = _json_loads(tc["function"]["arguments"])
                     except json.JSONDecodeError:
                         func_args = {}
 
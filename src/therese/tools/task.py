@@ -156,6 +156,7 @@ class TaskAddTool(Tool):
     """Ajoute une nouvelle tâche."""
 
     name = "task_add"
+    mutates_fs = True
     description = (
         "Ajoute une ou plusieurs tâches à la liste. "
         "Utilisez pour planifier et suivre le travail."
@@ -208,6 +209,7 @@ class TaskUpdateTool(Tool):
     """Met à jour le statut d'une tâche."""
 
     name = "task_update"
+    mutates_fs = True
     description = (
         "Met à jour le statut d'une tâche. "
         "Marquez les tâches comme en cours ou terminées."
@@ -11,6 +11,8 @@ class TreeTool(Tool):
     """Affiche l'arborescence d'un répertoire."""
 
     name = "tree"
+    mutates_fs = False
+    cacheable = True
     description = (
         "Affiche la structure arborescente d'un répertoire. "
         "Utile pour comprendre l'organisation d'un projet."
@@ -10,6 +10,7 @@ class WriteTool(Tool):
     """Écrit du contenu dans un fichier."""
 
     name = "write_file"
+    mutates_fs = True
     description = (
         "Écrit du contenu dans un fichier. Crée le fichier et les répertoires parents si nécessaire. "
         "ATTENTION: Écrase le contenu existant."
@@ -26,9 +26,6 @@ from textual.containers import ScrollableContainer, Horizontal, Vertical
 from textual.screen import ModalScreen
 from textual.widgets import Footer, Input, Static, Markdown, TextArea, ListView, ListItem, Label
 
-# Extensions d'images supportées
-IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp"}
-
 # Messages de réflexion humoristiques français
 THINKING_MESSAGES = [
     "🥖 Fait cuire une baguette...",
@@ -60,7 +57,7 @@ THINKING_MESSAGES = [
 
 from textual.message import Message
 
-from ..agent import ThereseAgent
+from ..agent import ThereseAgent, classify_paths, is_image_path
 from ..commands import process_slash_command
 from ..config import Colors, config
 from .theme import THERESE_CSS
@@ -99,8 +96,6 @@ def extract_paths_from_text(text: str) -> tuple[list[str], list[str], str]:
     Returns:
         (file_paths, image_paths, cleaned_text)
     """
-    file_paths = []
-    image_paths = []
     cleaned_text = text
 
     # Pattern pour trouver les chemins potentiels dans le texte
@@ -141,19 +136,14 @@ def extract_paths_from_text(text: str) -> tuple[list[str], list[str], str]:
     # Trier par position (du dernier au premier pour faciliter le remplacement)
     found_paths.sort(key=lambda x: x[0], reverse=True)
 
+    existing_paths: dict[str, None] = {}  # dict : dédoublonne en gardant l'ordre
     for start, end, raw_path in found_paths:
         # Nettoyer le chemin
         cleaned_path = clean_path(raw_path)
         expanded = os.path.expanduser(cleaned_path)
 
         if os.path.exists(expanded):
-            ext = Path(expanded).suffix.lower()
-            if ext in IMAGE_EXTENSIONS:
-                if expanded not in image_paths:
-                    image_paths.append(expanded)
-            else:
-                if expanded not in file_paths:
-                    file_paths.append(expanded)
+            existing_paths[expanded] = None
             # Retirer le chemin du texte
             # Trouver le vrai début/fin dans cleaned_text
             cleaned_text = cleaned_text.replace(raw_path, '').strip()
@@ -161,6 +151,7 @@ def extract_paths_from_text(text: str) -> tuple[list[str], list[str], str]:
     # Nettoyer les espaces multiples
     cleaned_text = ' '.join(cleaned_text.split())
 
+    image_paths, file_paths = classify_paths(list(existing_paths))
     return file_paths, image_paths, cleaned_text
 
 
@@ -265,8 +256,7 @@ class ExpandableInput(TextArea):
             event.prevent_default()
             event.stop()
 
-            ext = Path(expanded).suffix.lower()
-            if ext in IMAGE_EXTENSIONS:
+            if is_image_path(expanded):
                 # Image - émettre un message pour envoi direct
                 self.post_message(self.Submitted(self, "Analyse cette image.", [], [expanded]))
             else:
@@ -288,8 +278,7 @@ class ExpandableInput(TextArea):
         # Flèche bas = historique suivant
         if event.key == "down":
             # Seulement si on est sur la dernière ligne
-            lines = self.text.split('\n')
-            if self.cursor_location[0] == len(lines) - 1:
+            if self.cursor_location[0] == self.text.count('\n'):
                 event.prevent_default()
                 event.stop()
                 self._navigate_history(-1)  # Plus récent
@@ -956,7 +945,7 @@ class ThereseApp(App):
         super().__init__()
         if working_dir:
             config.working_dir = working_dir
-        self.agent = ThereseAgent()
+        self.agent = ThereseAgent(config=config)
         self.is_processing = False
         self.status_bar: StatusBar | None = None
         self._last_streaming_msg: StreamingMessage | None = None  # Pour toggle COT
@@ -0,0 +1,175 @@
+"""Tests de l'agent : cache des outils en lecture seule, compactage."""
+
+import pytest
+
+from therese.agent import Message, ThereseAgent, ToolRunCache
+from therese.config import ThereseConfig
+from therese.providers.base import ProviderBase, StreamChunk
+
+
+@pytest.fixture
+def agent(tmp_path):
+    agent = ThereseAgent(ThereseConfig(api_key="test", working_dir=tmp_path))
+    # Pas de checkpoint automatique dans ~/.therese pendant les tests
+    agent.checkpoint_manager = None
+    yield agent
+    agent.close()
+
+
+def test_read_is_served_from_cache(agent, tmp_path):
+    target = tmp_path / "notes.txt"
+    target.write_text("avant\n")
+
+    first = agent._execute_tool_sync("read_file", {"file_path": str(target)})
+    # Modification hors THERESE : invisible jusqu'au prochain tour
+    target.write_text("après\n")
+    second = agent._execute_tool_sync("read_file", {"file_path": str(target)})
+
+    assert "avant" in first
+    assert second == first
+    assert len(agent._tool_cache) == 1
+
+
+def test_write_tool_invalidates_cache(agent, tmp_path):
+    target = tmp_path / "notes.txt"
+    target.write_text("avant\n")
+    agent._execute_tool_sync("read_file", {"file_path": str(target)})
+
+    agent._execute_tool_sync("write_file", {"file_path": str(target), "content": "après\n"})
+    assert len(agent._tool_cache) == 0
+
+    result = agent._execute_tool_sync("read_file", {"file_path": str(target)})
+    assert "après" in result
+    assert "avant" not in result
+
+
+def test_failed_read_is_not_cached(agent, tmp_path):
+    missing = tmp_path / "absent.txt"
+
+    agent._execute_tool_sync("read_file", {"file_path": str(missing)})
+    assert len(agent._tool_cache) == 0
+
+    missing.write_text("présent\n")
+    assert "présent" in agent._execute_tool_sync("read_file", {"file_path": str(missing)})
+
+
+def test_different_arguments_use_different_entries(agent, tmp_path):
+    target = tmp_path / "lignes.txt"
+    target.write_text("un\ndeux\ntrois\n")
+
+    agent._execute_tool_sync("read_file", {"file_path": str(target), "limit": 1})
+    agent._execute_tool_sync("read_file", {"file_path": str(target), "limit": 2})
+
+    assert len(agent._tool_cache) == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ToolRunCache(maxsize=2)
+    a, b, c = (cache.make_key("read_file", {"file_path": p}) for p in "abc")
+    cache.put(a, "A")
+    cache.put(b, "B")
+    cache.get(a)  # a redevient le plus récent
+    cache.put(c, "C")
+
+    assert cache.get(a) == "A"
+    assert cache.get(b) is None
+    assert cache.get(c) == "C"
+
+
+def test_unserializable_arguments_are_not_cacheable():
+    class Unserializable:
+        def __repr__(self):
+            raise TypeError
+
+    assert ToolRunCache.make_key("read_file", {"x": {1, 2}}) is not None  # via default=str
+    assert ToolRunCache.make_key("read_file", {"x": Unserializable()}) is None
+
+
+def fake_summary(self, messages, provider=None) -> str:
+    return "résumé"
+
+
+def fill_history(agent, turns: int) -> None:
+    for i in range(turns):
+        agent._append_message(Message(role="user", content=f"question {i}"))
+        agent._append_message(Message(role="assistant", content=f"réponse {i}"))
+
+
+def test_manual_compact_ignores_threshold(agent, monkeypatch):
+    monkeypatch.setattr(ThereseAgent, "_generate_summary_sync", fake_summary)
+    fill_history(agent, 10)
+    assert not agent._should_auto_compact()
+
+    message = agent.compact()
+
+    assert "compactée" in message
+    assert "résumé" in agent.messages[1].content
+    assert len(agent.messages) <= agent.config.compact_keep_recent + 2
+
+
+def test_auto_compact_respects_threshold(agent, monkeypatch):
+    monkeypatch.setattr(ThereseAgent, "_generate_summary_sync", fake_summary)
+    fill_history(agent, 10)
+    before = len(agent.messages)
+
+    assert agent.auto_compact() == (False, "")
+    assert len(agent.messages) == before
+
+
+def test_only_audited_tools_run_in_parallel():
+    assert ThereseAgent._is_parallel_safe("read_file")
+    assert ThereseAgent._is_parallel_safe("grep")
+    # Outils non annotés : considérés comme modifiant l'état
+    assert not ThereseAgent._is_parallel_safe("web_fetch")
+    assert not ThereseAgent._is_parallel_safe("task_list")
+    assert not ThereseAgent._is_parallel_safe("outil_inconnu")
+
+
+class ScriptedProvider(ProviderBase):
+    """Provider de test : renvoie une réponse fixe et garde les requêtes."""
+
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.requests: list[dict] = []
+
+    def chat_stream(self, messages, model, tools=None, max_tokens=None):
+        self.requests.append({"prompt": messages[-1]["content"], "max_tokens": max_tokens})
+        yield StreamChunk(content=self.reply)
+
+    def list_models(self):
+        return []
+
+
+def long_history(turns: int, size: int) -> list[Message]:
+    return [Message(role="user", content=f"{i} " + "x" * size) for i in range(turns)]
+
+
+def test_short_history_is_summarized_in_one_section(agent):
+    provider = ScriptedProvider("résumé court")
+
+    summary = agent._generate_summary_sync(long_history(3, 100), provider)
+
+    assert summary == "résumé court"
+    assert len(provider.requests) == 1
+    assert "[[1]]" not in provider.requests[0]["prompt"]
+
+
+def test_long_history_is_summarized_by_windows_in_one_call(agent):
+    provider = ScriptedProvider("Résumés:\n[[1]] début\n[[2]] milieu\n[[3]] fin")
+    # 500 caractères gardés par message : 16 par fenêtre de 8000
+    messages = long_history(40, 1000)
+
+    summary = agent._generate_summary_sync(messages, provider)
+
+    assert len(provider.requests) == 1
+    prompt = provider.requests[0]["prompt"]
+    assert "[[3]]" in prompt and "[[4]]" not in prompt
+    assert provider.requests[0]["max_tokens"] >= 512
+    assert summary == "début\n\nmilieu\n\nfin"
+
+
+def test_windows_are_capped(agent):
+    windows = agent._summary_windows(long_history(200, 1000))
+
+    assert len(windows) == 4
+    assert all(len(window) <= 8000 for window in windows)
@@ -0,0 +1,27 @@
+"""Tests du chargement des agents YAML."""
+
+from therese.agents.loader import AgentConfig
+
+
+def test_null_list_fields_are_accepted(tmp_path):
+    path = tmp_path / "revue.yaml"
+    path.write_text("name: revue\ntools:\nmcp_servers:\ntags:\n")
+
+    agent = AgentConfig.from_yaml(path)
+
+    assert agent.tools is None
+    assert agent.mcp_servers == []
+    assert agent.tags == []
+
+
+def test_parsed_lists_are_not_shared_with_the_cache(tmp_path):
+    path = tmp_path / "revue.yaml"
+    path.write_text("name: revue\ntools: [read_file]\ntags: [qualité]\n")
+
+    first = AgentConfig.from_yaml(path)
+    first.tools.append("bash")
+    first.tags.clear()
+
+    second = AgentConfig.from_yaml(path)
+    assert second.tools == ["read_file"]
+    assert second.tags == ["qualité"]
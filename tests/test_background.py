@@ -0,0 +1,130 @@
+"""Tests du gestionnaire de tâches en arrière-plan."""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+from therese.background import BackgroundTaskManager, TaskStatus
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="commandes shell POSIX")
+
+
+def pid_alive(pid: int) -> bool:
+    """Vrai si le processus existe et n'est pas un zombie en attente de reaping."""
+    if sys.platform.startswith("linux"):
+        try:
+            with open(f"/proc/{pid}/stat") as stat:
+                return stat.read().rsplit(")", 1)[1].split()[0] != "Z"
+        except FileNotFoundError:
+            return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+async def wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "délai dépassé"
+        await asyncio.sleep(0.02)
+
+
+@pytest.fixture
+def manager():
+    manager = BackgroundTaskManager()
+    manager.KILL_GRACE_PERIOD = 0.5
+    return manager
+
+
+async def start(manager: BackgroundTaskManager, command: str):
+    done = asyncio.Event()
+    ok, message = await manager.run(command, on_complete=lambda task: done.set())
+    assert ok, message
+    task_id = message.split("`")[1]
+    return manager.get_task(task_id), done
+
+
+async def test_command_completes(manager):
+    task, done = await start(manager, "echo bonjour")
+    await asyncio.wait_for(done.wait(), 5)
+
+    assert task.status == TaskStatus.COMPLETED
+    assert task.return_code == 0
+    assert task.output.strip() == "bonjour"
+    assert task.process is None
+
+
+async def test_timeout_fails_task_and_kills_process(manager):
+    manager.MAX_TASK_DURATION = 0.3
+    task, done = await start(manager, "echo $$; exec sleep 30")
+    await wait_until(lambda: task.output)
+    pid = int(task.output.split()[0])
+
+    await asyncio.wait_for(done.wait(), 5)
+
+    assert task.status == TaskStatus.FAILED
+    assert "timeout" in task.error
+    assert not pid_alive(pid)
+    assert manager._active_count == 0
+
+
+async def test_kill_cancels_running_task(manager):
+    task, done = await start(manager, "echo $$; exec sleep 30")
+    await wait_until(lambda: task.output)
+    pid = int(task.output.split()[0])
+
+    ok, _ = await manager.kill(task.id)
+    await asyncio.wait_for(done.wait(), 5)
+
+    assert ok
+    assert task.status == TaskStatus.CANCELLED
+    assert not pid_alive(pid)
+
+
+async def test_kill_escalates_to_sigkill(manager):
+    task, done = await start(manager, "trap '' TERM; echo prêt; sleep 30")
+    await wait_until(lambda: task.output)
+
+    started = time.monotonic()
+    await manager.kill(task.id)
+    await asyncio.wait_for(done.wait(), 5)
+
+    assert task.status == TaskStatus.CANCELLED
+    assert time.monotonic() - started >= manager.KILL_GRACE_PERIOD
+
+
+async def test_kill_reaches_children_of_the_shell(manager):
+    task, done = await start(manager, "sleep 30 & echo $!; wait")
+    await wait_until(lambda: task.output)
+    child = int(task.output.split()[0])
+
+    await manager.kill(task.id)
+    await asyncio.wait_for(done.wait(), 5)
+
+    assert not pid_alive(child)
+
+
+async def test_children_outliving_the_shell_are_stopped(manager):
+    # Le shell sort aussitôt ; l'enfant détaché reste dans le groupe
+    task, done = await start(manager, "sleep 30 >/dev/null 2>&1 & echo $!")
+    await asyncio.wait_for(done.wait(), 5)
+    child = int(task.output.split()[0])
+
+    assert task.status == TaskStatus.COMPLETED
+    await wait_until(lambda: not pid_alive(child))
+
+
+async def test_kill_unknown_or_finished_task(manager):
+    ok, _ = await manager.kill("bg_inconnu")
+    assert not ok
+
+    task, done = await start(manager, "true")
+    await asyncio.wait_for(done.wait(), 5)
+    ok, message = await manager.kill(task.id)
+    assert not ok
+    assert "déjà terminée" in message
@@ -0,0 +1,57 @@
+"""Tests du gestionnaire de checkpoints."""
+
+import os
+
+import pytest
+
+from therese.checkpoints import CheckpointManager
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    # FileStorage range ses archives sous ~/.therese
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    working_dir = tmp_path / "proj"
+    working_dir.mkdir()
+    return working_dir
+
+
+def test_track_file_resolves_relative_paths_like_the_tools(project, monkeypatch):
+    manager = CheckpointManager(project)
+    (project / "src").mkdir()
+
+    monkeypatch.chdir(project / "src")
+    manager.track_file("main.py")
+
+    assert manager._modified_files == {str(project / "src" / "main.py")}
+
+
+def test_track_file_ignores_relative_paths_outside_the_project(project, tmp_path, monkeypatch):
+    manager = CheckpointManager(project)
+
+    monkeypatch.chdir(tmp_path)
+    manager.track_file("main.py")
+    manager.track_file(project / ".." / "autre.py")
+
+    assert manager._modified_files == set()
+
+
+def test_track_file_rejects_sibling_with_common_prefix(project, tmp_path):
+    manager = CheckpointManager(project)
+
+    manager.track_file(tmp_path / "proj-other" / "main.py")
+    manager.track_file(project / "main.py")
+
+    assert manager._modified_files == {str(project / "main.py")}
+
+
+@pytest.mark.skipif(os.name == "nt", reason="liens symboliques")
+def test_track_file_through_symlinked_working_dir(project, tmp_path):
+    link = tmp_path / "lien"
+    link.symlink_to(project)
+    manager = CheckpointManager(link)
+
+    manager.track_file(project / "main.py")
+
+    # Ré-enraciné sous working_dir : le storage archive relativement à lui
+    assert manager._modified_files == {str(link / "main.py")}
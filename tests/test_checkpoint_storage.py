@@ -0,0 +1,232 @@
+"""Tests des storages de checkpoints (journal de l'index, git stash)."""
+
+import json
+import shutil
+import subprocess
+from datetime import datetime, timedelta
+
+import pytest
+
+from therese.checkpoints import storage as storage_module
+from therese.checkpoints.storage import CheckpointData, FileStorage, GitStashStorage
+
+
+def make_checkpoint(cp_id: str, offset: int = 0) -> CheckpointData:
+    return CheckpointData(
+        id=cp_id,
+        name=f"cp {cp_id}",
+        timestamp=datetime(2026, 1, 1) + timedelta(minutes=offset),
+        files=[],
+    )
+
+
+@pytest.fixture
+def project(tmp_path):
+    working_dir = tmp_path / "projet"
+    working_dir.mkdir()
+    (working_dir / "main.py").write_text("print('v1')\n")
+    return working_dir
+
+
+@pytest.fixture
+def file_storage(project, tmp_path):
+    return FileStorage(project, storage_dir=tmp_path / "store")
+
+
+def reopen(storage: FileStorage) -> FileStorage:
+    """Nouvelle instance sur le même dossier (aucun index en mémoire)."""
+    return FileStorage(storage.working_dir, storage_dir=storage.storage_dir)
+
+
+def log_lines(storage: FileStorage) -> list[dict]:
+    return [json.loads(line) for line in storage._index_log.read_text().splitlines()]
+
+
+# --- Journal JSONL de l'index ---
+
+
+def test_saves_are_appended_to_the_journal(file_storage, project):
+    for i in range(3):
+        assert file_storage.save(make_checkpoint(f"cp{i}", i), [project / "main.py"])
+
+    assert not file_storage._index_file.exists()
+    assert [op["op"] for op in log_lines(file_storage)] == ["add", "add", "add"]
+
+
+def test_journal_is_replayed_on_load(file_storage, project):
+    for i in range(3):
+        file_storage.save(make_checkpoint(f"cp{i}", i), [project / "main.py"])
+    assert file_storage.delete("cp1")
+
+    ids = [cp.id for cp in reopen(file_storage).list_checkpoints()]
+    assert ids == ["cp2", "cp0"]
+
+
+def test_delete_unknown_id_writes_nothing(file_storage, project):
+    file_storage.save(make_checkpoint("cp0"), [project / "main.py"])
+
+    assert not file_storage.delete("inconnu")
+    assert len(log_lines(file_storage)) == 1
+
+
+def test_journal_is_compacted_into_snapshot(file_storage, project):
+    file_storage.COMPACT_MIN_OPS = 4
+    for i in range(5):
+        file_storage.save(make_checkpoint(f"cp{i}", i), [project / "main.py"])
+
+    # 5 opérations > max(2 * 5, 4) est faux : pas encore de compactage
+    assert file_storage._index_log.exists()
+
+    file_storage.delete_many(["cp0", "cp1", "cp2"])
+    # 8 opérations > max(2 * 2, 4) : le journal est replié dans l'instantané
+    assert not file_storage._index_log.exists()
+    snapshot = json.loads(file_storage._index_file.read_text())
+    assert sorted(snapshot["checkpoints"]) == ["cp3", "cp4"]
+    assert [cp.id for cp in reopen(file_storage).list_checkpoints()] == ["cp4", "cp3"]
+
+
+def test_snapshot_and_journal_are_combined(file_storage, project):
+    file_storage.COMPACT_MIN_OPS = 0
+    for i in range(3):
+        file_storage.save(make_checkpoint(f"cp{i}", i), [project / "main.py"])
+    file_storage.delete_many(["cp0", "cp1"])
+    assert file_storage._index_file.exists()
+    assert not file_storage._index_log.exists()
+
+    file_storage.COMPACT_MIN_OPS = 64
+    file_storage.save(make_checkpoint("cp3", 3), [project / "main.py"])
+    assert len(log_lines(file_storage)) == 1
+
+    assert [cp.id for cp in reopen(file_storage).list_checkpoints()] == ["cp3", "cp2"]
+
+
+def test_truncated_journal_line_is_skipped_and_rewritten(file_storage, project):
+    file_storage.save(make_checkpoint("cp0"), [project / "main.py"])
+    with open(file_storage._index_log, "ab") as log:
+        log.write(b'{"op": "add", "cp": {"id"')  # Arrêt pendant une écriture
+
+    storage = reopen(file_storage)
+    assert [cp.id for cp in storage.list_checkpoints()] == ["cp0"]
+
+    # Pas d'ajout derrière la ligne tronquée : instantané complet à la place
+    storage.save(make_checkpoint("cp1", 1), [project / "main.py"])
+    assert not storage._index_log.exists()
+    assert [cp.id for cp in reopen(storage).list_checkpoints()] == ["cp1", "cp0"]
+
+
+def test_legacy_list_index_is_migrated(file_storage, project):
+    legacy = {"checkpoints": [
+        {"id": "old", "name": "ancien", "timestamp": "2025-06-01T12:00:00", "files": []},
+    ]}
+    file_storage._index_file.write_text(json.dumps(legacy))
+
+    file_storage.save(make_checkpoint("cp0"), [project / "main.py"])
+
+    assert [cp.id for cp in reopen(file_storage).list_checkpoints()] == ["cp0", "old"]
+
+
+def test_index_reloads_after_external_change(file_storage, project):
+    file_storage.save(make_checkpoint("cp0"), [project / "main.py"])
+    other = reopen(file_storage)
+    assert len(other.list_checkpoints()) == 1
+
+    file_storage.save(make_checkpoint("cp1", 1), [project / "main.py"])
+
+    assert len(other.list_checkpoints()) == 2
+
+
+def test_restore_from_archive(file_storage, project):
+    main = project / "main.py"
+    file_storage.save(make_checkpoint("cp0"), [main])
+    main.write_text("print('v2')\n")
+
+    assert file_storage.restore("cp0")
+    assert main.read_text() == "print('v1')\n"
+
+
+# --- git stash : parité pygit2 / sous-processus git ---
+
+
+def git(cwd, *args) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+@pytest.fixture
+def repo(project):
+    if shutil.which("git") is None:
+        pytest.skip("git absent")
+    git(project, "init", "-q")
+    git(project, "config", "user.name", "Test")
+    git(project, "config", "user.email", "test@example.com")
+    git(project, "add", ".")
+    git(project, "commit", "-q", "-m", "init")
+    return project
+
+
+def make_stash_storage(working_dir, backend: str) -> GitStashStorage:
+    storage = GitStashStorage(working_dir)
+    if backend == "git":
+        storage._repo = False  # Force le sous-processus git
+    return storage
+
+
+BACKENDS = [
+    pytest.param(
+        "pygit2",
+        marks=pytest.mark.skipif(storage_module.pygit2 is None, reason="pygit2 absent"),
+    ),
+    "git",
+]
+
+
+@pytest.mark.parametrize("save_backend", BACKENDS)
+@pytest.mark.parametrize("restore_backend", BACKENDS)
+def test_stash_roundtrip_across_backends(repo, save_backend, restore_backend):
+    main = repo / "main.py"
+    main.write_text("print('v2')\n")
+    (repo / "nouveau.py").write_text("x = 1\n")
+
+    saver = make_stash_storage(repo, save_backend)
+    assert saver.save(make_checkpoint("cp0"), [])
+    if save_backend == "pygit2":
+        assert saver._git_repo() is not None
+
+    # Le stash a remis l'arbre de travail au dernier commit
+    assert main.read_text() == "print('v1')\n"
+    assert not (repo / "nouveau.py").exists()
+    assert "THERESE_CP:cp0:" in git(repo, "stash", "list")
+
+    restorer = make_stash_storage(repo, restore_backend)
+    assert [cp.id for cp in restorer.list_checkpoints()] == ["cp0"]
+    assert restorer.restore("cp0")
+
+    assert main.read_text() == "print('v2')\n"
+    assert (repo / "nouveau.py").read_text() == "x = 1\n"
+    assert git(repo, "stash", "list") == ""
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_stash_restore_picks_the_matching_entry(repo, backend):
+    main = repo / "main.py"
+    storage = make_stash_storage(repo, backend)
+    main.write_text("print('a')\n")
+    storage.save(make_checkpoint("cpa"), [])
+    main.write_text("print('b')\n")
+    storage.save(make_checkpoint("cpb", 1), [])
+
+    assert storage.restore("cpa")
+    assert main.read_text() == "print('a')\n"
+    assert "THERESE_CP:cpb:" in git(repo, "stash", "list")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_stash_restore_without_any_stash(repo, backend):
+    storage = make_stash_storage(repo, backend)
+    storage._append_index([{"op": "add", "cp": {
+        "id": "cp0", "name": "perdu", "timestamp": "2026-01-01T00:00:00", "files": [],
+    }}])
+
+    assert not storage.restore("cp0")
+    assert not storage.restore("inconnu")